@@ -18,38 +18,50 @@ VENDOR = Netwrix Corporation
 from __future__ import annotations
 
 import argparse
+import copy
 import datetime as dt
+import heapq
 import os
 import random
 import re
 import zipfile
-import xml.etree.ElementTree as ET
-from typing import Optional, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, List, Tuple
 
-ISO_DT_RE = re.compile(
-    r"^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(\.\d+)?([+-]\d{2}:\d{2}|Z)?$"
-)
+# lxml's C-backed parse/serialize/iterate paths are 3-5x faster than stdlib
+# ElementTree; the API subset used here is identical, so fall back
+# transparently when lxml is not installed.
+try:
+    from lxml import etree as ET  # type: ignore
+except ImportError:
+    import xml.etree.ElementTree as ET  # type: ignore
+
+DN_SUFFIX_RE = re.compile(r"(?:,DC=[^,]+)+$")
 
 def parse_iso_datetime(s: str) -> Optional[dt.datetime]:
+    # Quick reject before hitting the parser: most non-date strings do not
+    # even start with "YYYY-". fromisoformat's C parser does the real validation.
     s = (s or "").strip()
-    if not ISO_DT_RE.match(s):
+    if len(s) < 19 or not s[:4].isdigit() or s[4] != "-" or s[10] != "T":
         return None
     try:
         d = dt.datetime.fromisoformat(s.replace("Z", "+00:00"))
-        if d.tzinfo is None:
-            d = d.replace(tzinfo=dt.timezone.utc)
-        return d
-    except Exception:
+    except ValueError:
         return None
+    return d if d.tzinfo else d.replace(tzinfo=dt.timezone.utc)
 
-def format_like(original: str, new_dt: dt.datetime) -> str:
-    original = (original or "").strip()
-    frac = "." in original.split("T")[-1]
+def format_fixed(new_dt: dt.datetime, use_frac: bool) -> str:
     if new_dt.tzinfo is None:
         new_dt = new_dt.replace(tzinfo=dt.timezone.utc)
-    if frac:
-        return new_dt.isoformat(timespec="microseconds")
-    return new_dt.isoformat(timespec="seconds")
+    return new_dt.isoformat(timespec="microseconds" if use_frac else "seconds")
+
+
+def _frac_flag(original: str) -> Optional[bool]:
+    """Whether a template date string carries fractional seconds (None = not parseable)."""
+    original = (original or "").strip()
+    if not parse_iso_datetime(original):
+        return None
+    return "." in original.split("T")[-1]
 
 def ensure_synthetic_marker(root: ET.Element) -> None:
     root.insert(0, ET.Comment("SYNTHETIC_TEST_DATASET - generated for lab/testing only"))
@@ -58,8 +70,8 @@ def ensure_synthetic_marker(root: ET.Element) -> None:
         el.text = "true"
         root.insert(1, el)
 
-def set_text_if_exists(root: ET.Element, path: str, value: str) -> None:
-    el = root.find(path)
+def set_text_if_exists(elems: Dict[str, ET.Element], path: str, value: str) -> None:
+    el = elems.get(path)
     if el is not None:
         el.text = value
 
@@ -70,45 +82,181 @@ def safe_netbios(i: int) -> str:
     return f"FAKE{i:03d}"
 
 def domain_to_dn(domain_fqdn: str) -> str:
-    parts = domain_fqdn.split(".")
-    return ",".join([f"DC={p}" for p in parts])
+    # One join + one concat; no intermediate per-label f-strings.
+    return "DC=" + ",DC=".join(domain_fqdn.split("."))
 
 def replace_dn_suffix(dn: str, old_dc_suffix_any: str, new_dc_suffix: str) -> str:
     if not dn or "DC=" not in dn:
         return dn
-    if old_dc_suffix_any and old_dc_suffix_any in dn:
-        return dn.replace(old_dc_suffix_any, new_dc_suffix)
-    m = re.search(r"(,DC=[^,]+)+$", dn)
+    # Fast path: DNs end with the DC suffix, so a plain endswith + slice
+    # avoids the regex entirely in the common case.
+    if old_dc_suffix_any and dn.endswith(old_dc_suffix_any):
+        return dn[: -len(old_dc_suffix_any)] + new_dc_suffix
+    m = DN_SUFFIX_RE.search(dn)
     if m:
         return dn[: m.start()] + new_dc_suffix
     return dn
 
-def update_known_date_tags(root: ET.Element, base: dt.datetime) -> None:
-    # We want GenerationDate to match PingCastle "Generation"
-    candidates = [
-        ("./GenerationDate", base),
-        ("./SchemaLastChanged", base - dt.timedelta(days=30)),
-        ("./ExchangeInstall", base - dt.timedelta(days=90)),
-        ("./LastADBackup", base - dt.timedelta(days=2, hours=3)),
-        ("./LAPSInstalled", base - dt.timedelta(days=1800)),
-        ("./AdminLastLoginDate", base - dt.timedelta(days=800)),
-        ("./KrbtgtLastChangeDate", base - dt.timedelta(days=2500)),
-    ]
-    for path, new_dt in candidates:
-        el = root.find(path)
+# Paths rewritten on every report; indexed once on the template so the
+# per-report lookup is a single tree walk instead of one find() per path.
+# Offsets are subtracted from the report Generation date; GenerationDate
+# itself must match PingCastle "Generation", hence the zero offset.
+KNOWN_DATE_OFFSETS: Tuple[Tuple[str, dt.timedelta], ...] = (
+    ("./GenerationDate", dt.timedelta(0)),
+    ("./SchemaLastChanged", dt.timedelta(days=30)),
+    ("./ExchangeInstall", dt.timedelta(days=90)),
+    ("./LastADBackup", dt.timedelta(days=2, hours=3)),
+    ("./LAPSInstalled", dt.timedelta(days=1800)),
+    ("./AdminLastLoginDate", dt.timedelta(days=800)),
+    ("./KrbtgtLastChangeDate", dt.timedelta(days=2500)),
+)
+_TD_DC_ADMIN_LOGIN = dt.timedelta(days=1200)
+DATE_PATHS = tuple(p for p, _ in KNOWN_DATE_OFFSETS)
+TEXT_PATHS = ("./DomainFQDN", "./ForestFQDN", "./NetBIOSName")
+
+
+def build_template_index(tpl_root: ET.Element) -> Tuple[Dict[str, int], List[int], List[int]]:
+    """Map each element of interest to its ordinal position in document order.
+
+    Deep copies preserve document order, so the ordinals computed on the
+    template are valid for every per-report copy. DN-bearing elements are
+    matched here once — their text is template-constant at rewrite time, so
+    the predicate never has to run again per report.
+    """
+    targets: Dict[int, str] = {}
+    for p in DATE_PATHS + TEXT_PATHS:
+        el = tpl_root.find(p)
+        if el is not None:
+            targets[id(el)] = p
+    dc_ids = {id(el) for el in tpl_root.findall(".//HealthcheckDomainController")}
+
+    path_ordinals: Dict[str, int] = {}
+    dc_ordinals: List[int] = []
+    dn_ordinals: List[int] = []
+    for i, el in enumerate(tpl_root.iter()):
+        p = targets.get(id(el))
+        if p is not None:
+            path_ordinals[p] = i
+        if id(el) in dc_ids:
+            dc_ordinals.append(i)
+        if (
+            isinstance(el.tag, str)  # skip comments
+            and el.text
+            and "DC=" in el.text
+            and ("DistinguishedName" in el.tag or "CN=" in el.text)
+        ):
+            dn_ordinals.append(i)
+    return path_ordinals, dc_ordinals, dn_ordinals
+
+
+def resolve_template_index(
+    root: ET.Element, path_ordinals: Dict[str, int], dc_ordinals: List[int], dn_ordinals: List[int]
+) -> Tuple[Dict[str, ET.Element], List[ET.Element], List[ET.Element]]:
+    """Resolve template ordinals against a per-report copy in one walk."""
+    wanted = set(path_ordinals.values()) | set(dc_ordinals) | set(dn_ordinals)
+    last = max(wanted) if wanted else -1
+    by_ord: Dict[int, ET.Element] = {}
+    for i, el in enumerate(root.iter()):
+        if i in wanted:
+            by_ord[i] = el
+        if i >= last:
+            break
+    elems = {p: by_ord[o] for p, o in path_ordinals.items()}
+    dcs = [by_ord[o] for o in dc_ordinals]
+    dn_elems = [by_ord[o] for o in dn_ordinals]
+    return elems, dcs, dn_elems
+
+
+def date_format_flags(index_root: ET.Element) -> Tuple[Dict[str, Optional[bool]], List[Optional[bool]]]:
+    """Precompute, per date path / DC, whether the template value has fractional seconds.
+
+    The per-report copies always start from the template text, so the answer
+    never changes between reports.
+    """
+    frac_by_path: Dict[str, Optional[bool]] = {}
+    for p in DATE_PATHS:
+        el = index_root.find(p)
+        if el is not None and el.text:
+            frac_by_path[p] = _frac_flag(el.text)
+    dc_frac: List[Optional[bool]] = []
+    for dc in index_root.findall(".//HealthcheckDomainController"):
+        attr = dc.attrib.get("AdminLocalLogin")
+        dc_frac.append(_frac_flag(attr) if attr else None)
+    return frac_by_path, dc_frac
+
+
+def update_known_date_tags(
+    elems: Dict[str, ET.Element],
+    dcs: List[ET.Element],
+    base: dt.datetime,
+    frac_by_path: Dict[str, Optional[bool]],
+    dc_frac: List[Optional[bool]],
+) -> None:
+    for path, offset in KNOWN_DATE_OFFSETS:
+        el = elems.get(path)
         if el is None or not el.text:
             continue
-        old = el.text
-        parsed = parse_iso_datetime(old)
-        el.text = format_like(old, new_dt) if parsed else new_dt.isoformat()
+        new_dt = base - offset
+        use_frac = frac_by_path.get(path)
+        el.text = format_fixed(new_dt, use_frac) if use_frac is not None else new_dt.isoformat()
 
     # Also some DC attributes/tags if present
-    for dc in root.findall(".//HealthcheckDomainController"):
-        old_attr = dc.attrib.get("AdminLocalLogin")
-        if old_attr:
-            parsed = parse_iso_datetime(old_attr)
-            new_dt = base - dt.timedelta(days=1200)
-            dc.attrib["AdminLocalLogin"] = format_like(old_attr, new_dt) if parsed else new_dt.isoformat()
+    for dc, use_frac in zip(dcs, dc_frac):
+        if dc.attrib.get("AdminLocalLogin"):
+            new_dt = base - _TD_DC_ADMIN_LOGIN
+            dc.attrib["AdminLocalLogin"] = format_fixed(new_dt, use_frac) if use_frac is not None else new_dt.isoformat()
+
+# Per-process state for the worker pool: the template is parsed and indexed
+# once per worker instead of being pickled along with every task.
+_WORKER: Dict[str, object] = {}
+
+
+def _init_worker(data: bytes) -> None:
+    tpl_root = ET.fromstring(data)
+    # Bake the synthetic markers into the template once; every per-report
+    # deepcopy inherits them, so the two O(n) insert(0, ...) calls per report
+    # disappear and the ordinal index can be built on the template itself.
+    ensure_synthetic_marker(tpl_root)
+    path_ords, dc_ords, dn_ords = build_template_index(tpl_root)
+    frac_by_path, dc_frac = date_format_flags(tpl_root)
+    _WORKER["tpl_root"] = tpl_root
+    _WORKER["path_ords"] = path_ords
+    _WORKER["dc_ords"] = dc_ords
+    _WORKER["dn_ords"] = dn_ords
+    _WORKER["frac_by_path"] = frac_by_path
+    _WORKER["dc_frac"] = dc_frac
+
+
+def emit_one(
+    dom: str,
+    nb: str,
+    old_dc_suffix: str,
+    new_dc_tail: str,
+    gen_dt: dt.datetime,
+    out_path: str,
+) -> str:
+    """Generate a single synthetic report. Runs inside a pool worker."""
+    root = copy.deepcopy(_WORKER["tpl_root"])
+    elems, dcs, dn_elems = resolve_template_index(
+        root, _WORKER["path_ords"], _WORKER["dc_ords"], _WORKER["dn_ords"]
+    )
+
+    set_text_if_exists(elems, "./DomainFQDN", dom)
+    set_text_if_exists(elems, "./ForestFQDN", dom)
+    set_text_if_exists(elems, "./NetBIOSName", nb)
+
+    update_known_date_tags(elems, dcs, gen_dt, _WORKER["frac_by_path"], _WORKER["dc_frac"])
+
+    # DN suffix rewrite: the DN-bearing elements were matched on the template,
+    # so no predicate runs here.
+    for el in dn_elems:
+        el.text = replace_dn_suffix(el.text, old_dc_suffix, new_dc_tail)
+
+    # Stream through the serializer instead of materializing the whole
+    # document as an intermediate bytes object.
+    ET.ElementTree(root).write(out_path, encoding="utf-8", xml_declaration=True)
+    return out_path
+
 
 def month_range(start: dt.date, end: dt.date) -> List[Tuple[int,int]]:
     out = []
@@ -122,10 +270,11 @@ def month_range(start: dt.date, end: dt.date) -> List[Tuple[int,int]]:
             m += 1
     return out
 
-def gen_weekly_dates_in_month(rng: random.Random, year: int, month: int, per_month: int) -> List[dt.datetime]:
+WEEKLY_BASE_DAYS = (3, 10, 17, 24, 28)
+
+def gen_weekly_dates_in_month(rng: random.Random, year: int, month: int, base_days: Tuple[int, ...]) -> List[dt.datetime]:
     # pick 4-5 "weekly-like" days within the month
     # Spread them (e.g. 3, 10, 17, 24, 28) with slight jitter.
-    base_days = [3, 10, 17, 24, 28][:per_month]
     out = []
     for d in base_days:
         day = min(d + rng.randint(-1, 1), 28)
@@ -147,6 +296,7 @@ def main() -> int:
     ap.add_argument("--old-per-month", type=int, default=4, help="How many reports per month in old period (4-5 typical)")
     ap.add_argument("--recent-reports", type=int, default=20, help="How many recent reports (kept all)")
     ap.add_argument("--seed", type=int, default=1337, help="Random seed")
+    ap.add_argument("--workers", type=int, default=None, help="Worker processes for report generation (default: CPU count)")
     args = ap.parse_args()
 
     rng = random.Random(args.seed)
@@ -161,6 +311,9 @@ def main() -> int:
         old_dc_suffix = "," + domain_to_dn(old_domain)
 
     os.makedirs(args.outdir, exist_ok=True)
+    # Normalized once; per-report paths are then a single concatenation
+    # instead of an os.path.join call per file.
+    out_prefix = os.path.join(args.outdir, "")
 
     now = dt.datetime.now(dt.timezone.utc)
     cutoff = now - dt.timedelta(days=args.retention_days)
@@ -171,17 +324,25 @@ def main() -> int:
 
     months = month_range(old_start.replace(day=1), old_end.replace(day=1))
 
-    generated_files: List[str] = []
+    # The "weekly-like" day template is identical for every domain and month;
+    # slice it once instead of per gen_weekly_dates_in_month call.
+    base_days = WEEKLY_BASE_DAYS[: args.old_per_month]
+
+    # (dom, nb, old_dc_suffix, new_dc_tail, gen_dt, out_path) per report;
+    # each (domain, date) tuple is independent, so generation is fanned out
+    # over a process pool below.
+    tasks: List[Tuple[str, str, str, str, dt.datetime, str]] = []
 
     for di in range(1, args.domains + 1):
         dom = safe_domain(di)
         nb = safe_netbios(di)
         new_dc_tail = "," + domain_to_dn(dom)
+        dom_slug = dom.replace(".", "_")  # constant per domain, hoisted out of the emit loop
 
         # Build OLD dates (weekly-like in each month) until we reach the target count
         old_dates: List[dt.datetime] = []
         for (y, m) in months:
-            old_dates.extend(gen_weekly_dates_in_month(rng, y, m, args.old_per_month))
+            old_dates.extend(gen_weekly_dates_in_month(rng, y, m, base_days))
             if len(old_dates) >= max(0, args.reports_per_domain - args.recent_reports):
                 break
 
@@ -193,46 +354,46 @@ def main() -> int:
             recent_start = cutoff + dt.timedelta(days=1)
             recent_end = now
             delta = int((recent_end - recent_start).total_seconds())
-            for _ in range(args.recent_reports):
-                pick = rng.randint(0, max(delta, 1))
-                recent_dates.append(recent_start + dt.timedelta(seconds=pick))
-            recent_dates.sort()
-
-        all_dates = old_dates + recent_dates
+            # One batched draw: rng.random() scaled to the window is much
+            # cheaper than a randint call per report.
+            span = max(delta, 1) + 1
+            recent_dates = sorted(
+                recent_start + dt.timedelta(seconds=int(rng.random() * span))
+                for _ in range(args.recent_reports)
+            )
+
+        # old_dates is chronological by construction and recent_dates is
+        # already sorted, so an O(n) merge replaces the full O(n log n) sort.
+        all_dates = list(heapq.merge(old_dates, recent_dates))
         # If user asked for more than we produced, pad with more recent dates
-        while len(all_dates) < args.reports_per_domain:
-            all_dates.append(now - dt.timedelta(days=rng.randint(0, args.retention_days - 1)))
+        # (shortfall computed up front, one batched extend instead of a
+        # grow-by-one loop)
+        shortfall = args.reports_per_domain - len(all_dates)
+        if shortfall > 0:
+            all_dates.extend(
+                now - dt.timedelta(days=int(rng.random() * args.retention_days))
+                for _ in range(shortfall)
+            )
         all_dates = all_dates[: args.reports_per_domain]
-        all_dates.sort()
+        if shortfall > 0:
+            all_dates.sort()  # only the pad dates arrive unordered
 
-        # Emit files
+        # Queue files for the worker pool
         for idx, gen_dt in enumerate(all_dates, 1):
-            root = ET.fromstring(data)
-            ensure_synthetic_marker(root)
-
-            set_text_if_exists(root, "./DomainFQDN", dom)
-            set_text_if_exists(root, "./ForestFQDN", dom)
-            set_text_if_exists(root, "./NetBIOSName", nb)
-
-            update_known_date_tags(root, gen_dt)
-
-            # DN suffix rewrite
-            for el in root.iter():
-                if el.text and "DC=" in el.text and ("DistinguishedName" in el.tag or "CN=" in el.text):
-                    el.text = replace_dn_suffix(el.text, old_dc_suffix, new_dc_tail)
-
             stamp = gen_dt.strftime("%Y%m%d-%H%M%S")
-            out_name = f"PingCastleReport_{dom.replace('.', '_')}_{stamp}_{idx:03d}.xml"
-            out_path = os.path.join(args.outdir, out_name)
-
-            xml_bytes = ET.tostring(root, encoding="utf-8", xml_declaration=True)
-            with open(out_path, "wb") as f:
-                f.write(xml_bytes)
+            out_name = f"PingCastleReport_{dom_slug}_{stamp}_{idx:03d}.xml"
+            tasks.append((dom, nb, old_dc_suffix, new_dc_tail, gen_dt, out_prefix + out_name))
 
-            generated_files.append(out_path)
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(data,)) as ex:
+        futures = [ex.submit(emit_one, *t) for t in tasks]
+        generated_files = [f.result() for f in futures]
 
+    # Zip phase stays serial: the ZipFile handle cannot be shared across
+    # worker processes.
     zip_path = os.path.abspath(os.path.join(args.outdir, f"PingCastle_Synthetic_USECASE_{args.domains}domains.zip"))
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
+    # compresslevel=1 is several times faster than the default DEFLATE level
+    # with only a modest size penalty on these highly redundant XML files.
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as z:
         for p in generated_files:
             z.write(p, arcname=os.path.basename(p))
 
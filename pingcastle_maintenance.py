@@ -1,1430 +1,1884 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-
-"""
-PingCastle Database Maintenance
-Monthly Retention Cleanup (based on report Generation / "Last report")
-
-Main :
-- Weekly scans for years
-- Keep ALL reports for the last N days (e.g. 1 year)
-- For reports OLDER than N days: keep ONLY ONE report per month per domain
-  (the latest report of that month based on Generation / "Last report")
-- Dry-run by default, optional archive, optional delete
-
-AUTHOR = Karim AZZOUZI
-VENDOR = Netwrix Corporation
-"""
-
-from __future__ import annotations
-
-import base64
-import csv
-import datetime as dt
-import getpass
-import json
-import os
-import platform
-import traceback
-import zipfile
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple, Iterable
-
-# -------------------------
-# Dependencies
-# -------------------------
-try:
-    import pyodbc  # type: ignore
-except Exception:
-    print("Missing dependency: pyodbc")
-    raise
-
-try:
-    from rich.console import Console
-    from rich.panel import Panel
-    from rich.table import Table
-    from rich.prompt import Prompt, Confirm
-    from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeElapsedColumn
-    from rich.align import Align
-    from rich.text import Text
-    from rich.rule import Rule
-except Exception:
-    print("Missing dependency: rich")
-    raise
-
-console = Console()
-
-# -------------------------
-# i18n
-# -------------------------
-LANGS = ["EN", "FR", "IT", "DE", "ES"]
-
-T: Dict[str, Dict[str, str]] = {
-    "EN": {
-        "title": "PingCastle Database Maintenance",
-        "subtitle": "Monthly Retention Cleanup (Generation / Last report)",
-        "tagline": "Keep everything recent • Keep 1 per month per domain for old reports • Optional archive/delete",
-        "author": "AUTHOR = Karim AZZOUZI",
-        "vendor": "VENDOR = Netwrix Corporation",
-
-        "language": "Language",
-        "invalid": "Invalid input, please retry.",
-        "press_enter": "Press Enter to continue",
-
-        "step": "Step",
-        "sql_conn": "SQL Server connection",
-        "odbc_driver": "Installed ODBC drivers (SQL Server)",
-        "select_driver": "Select driver #",
-
-        "host": "SQL Server host",
-        "instance": "Instance name (blank for default)",
-        "port": "TCP port",
-        "db": "Database name",
-        "auth": "Authentication [windows/sql]",
-        "user": "SQL username",
-        "pwd": "SQL password",
-        "encrypt": "Encrypt connection?",
-        "trust": "Trust server certificate?",
-        "testing": "Testing connection...",
-        "test_ok": "Connection OK.",
-        "test_fail": "Connection failed.",
-        "retry": "Retry connection settings?",
-
-        "detect_reports": "Detecting PingCastle Reports table",
-        "detect_children": "Detecting dependent tables (FK to Reports)",
-        "reports_found": "Reports table found",
-        "children_found": "Dependent tables found",
-        "using_domain_name": "Domain name column detected",
-
-        "retention": "Retention settings",
-        "choose_retention": "Choose retention threshold",
-        "ret_1y": "1) 1 year (365 days)",
-        "ret_6m": "2) 6 months (183 days)",
-        "ret_custom": "3) Custom days",
-        "ret_prompt": "Selection [1/2/3]",
-        "custom_days": "Enter retention days",
-
-        "logic_title": "Customer rule",
-        "logic_body": (
-            "Reference date = Generation (aka 'Last report').\n"
-            "• Reports newer than the threshold: KEEP ALL\n"
-            "• Reports older than the threshold: KEEP ONLY the latest report per month per domain\n"
-            "  and REMOVE the extra weekly reports."
-        ),
-
-        "plan": "Building retention plan",
-        "loading_reports": "Loading reports from DB",
-        "summary": "Retention Summary",
-        "total": "Total reports",
-        "cutoff": "Cutoff (UTC)",
-        "old": "Reports older than threshold (Generation)",
-        "keep_recent": "Reports kept (recent)",
-        "keep_monthly": "Reports kept (monthly for old)",
-        "extras": "Reports to remove (extras)",
-
-        "per_domain": "Top domains with most removals",
-        "domain": "Domain",
-        "remove_count": "To remove",
-        "kept_old_monthly": "Kept monthly (old)",
-
-        "export_plan": "Exporting plan (CSV)",
-        "plan_folder": "Plan folder",
-        "plan_exported": "Plan exported",
-
-        "preview_delete": "Preview: first rows to remove",
-        "no_extras": "Nothing to remove. Exiting.",
-        "safe_default_archive": "Default archive directory",
-        "action_old": "For reports older than threshold: action [archive/delete]",
-        "archive_dir": "Archive directory",
-        "archive_fmt": "Archive format [jsonl/csv]",
-        "zip_q": "Create ZIP archive?",
-        "dryrun_prep": "Dry-run: preparing delete set (no data changed)",
-        "dryrun_table": "Dry-run: impacted rows per table",
-        "dryrun_ready": "Dry-run ready. Reports to remove",
-        "apply": "Apply changes now? (Dry-run is default)",
-        "final_confirm": "Final confirmation: this will DELETE data. Continue?",
-
-        "archiving": "Archiving selected reports",
-        "archive_created": "Archive created",
-        "zip_created": "Archive ZIP created",
-
-        "deleting": "Deleting dependent tables and reports",
-        "done": "Done.",
-        "dryrun_only": "Dry-run only. No changes applied.",
-        "cancelled": "Cancelled. No deletion applied.",
-        "logfile": "Log file",
-        "err": "ERROR",
-        "connected_to": "Connected to",
-    },
-
-    "FR": {
-        "title": "Maintenance Base de Données PingCastle",
-        "subtitle": "Nettoyage Rétention Mensuelle (Génération / Dernier rapport)",
-        "tagline": "Tout garder en récent • 1/mois/domaine pour l’ancien • Archivage/Suppression optionnels",
-        "author": "AUTHOR = Karim AZZOUZI",
-        "vendor": "VENDOR = Netwrix Corporation",
-
-        "language": "Langue",
-        "invalid": "Entrée invalide, merci de réessayer.",
-        "press_enter": "Appuyez sur Entrée pour continuer",
-
-        "step": "Étape",
-        "sql_conn": "Connexion SQL Server",
-        "odbc_driver": "Drivers ODBC installés (SQL Server)",
-        "select_driver": "Choisir le driver #",
-
-        "host": "Hôte SQL Server",
-        "instance": "Nom d’instance (vide = instance par défaut)",
-        "port": "Port TCP",
-        "db": "Nom de la base",
-        "auth": "Authentification [windows/sql]",
-        "user": "Utilisateur SQL",
-        "pwd": "Mot de passe SQL",
-        "encrypt": "Chiffrer la connexion ?",
-        "trust": "Faire confiance au certificat serveur ?",
-        "testing": "Test de connexion...",
-        "test_ok": "Connexion OK.",
-        "test_fail": "Échec de connexion.",
-        "retry": "Recommencer la saisie de connexion ?",
-
-        "detect_reports": "Détection de la table Reports PingCastle",
-        "detect_children": "Détection des tables dépendantes (FK vers Reports)",
-        "reports_found": "Table Reports détectée",
-        "children_found": "Tables dépendantes détectées",
-        "using_domain_name": "Colonne de nom de domaine détectée",
-
-        "retention": "Paramètres de rétention",
-        "choose_retention": "Choisissez le seuil de conservation",
-        "ret_1y": "1) 1 an (365 jours)",
-        "ret_6m": "2) 6 mois (183 jours)",
-        "ret_custom": "3) Jours personnalisés",
-        "ret_prompt": "Sélection [1/2/3]",
-        "custom_days": "Entrez le nombre de jours de conservation",
-
-        "logic_title": "Règle client",
-        "logic_body": (
-            "Date de référence = Génération (aka 'Dernier rapport').\n"
-            "• Rapports plus récents que le seuil : TOUT CONSERVER\n"
-            "• Rapports plus anciens que le seuil : ne conserver que le plus récent du mois par domaine\n"
-            "  et supprimer les rapports hebdomadaires en trop."
-        ),
-
-        "plan": "Construction du plan de rétention",
-        "loading_reports": "Chargement des rapports depuis la DB",
-        "summary": "Résumé de Rétention",
-        "total": "Total des rapports",
-        "cutoff": "Seuil (UTC)",
-        "old": "Rapports plus anciens que le seuil (Génération)",
-        "keep_recent": "Rapports conservés (récents)",
-        "keep_monthly": "Rapports conservés (mensuels pour anciens)",
-        "extras": "Rapports à supprimer (extras)",
-
-        "per_domain": "Top domaines avec le plus de suppressions",
-        "domain": "Domaine",
-        "remove_count": "À supprimer",
-        "kept_old_monthly": "Mensuels conservés (anciens)",
-
-        "export_plan": "Export du plan (CSV)",
-        "plan_folder": "Dossier du plan",
-        "plan_exported": "Plan exporté",
-
-        "preview_delete": "Aperçu : premières lignes à supprimer",
-        "no_extras": "Rien à supprimer. Fin.",
-        "safe_default_archive": "Dossier d’archive par défaut",
-        "action_old": "Pour les rapports plus anciens que le seuil : action [archive/delete]",
-        "archive_dir": "Dossier d’archivage",
-        "archive_fmt": "Format d’archive [jsonl/csv]",
-        "zip_q": "Créer une archive ZIP ?",
-        "dryrun_prep": "Dry-run : préparation de la suppression (aucune donnée modifiée)",
-        "dryrun_table": "Dry-run : lignes impactées par table",
-        "dryrun_ready": "Dry-run prêt. Rapports à supprimer",
-        "apply": "Appliquer maintenant ? (Dry-run par défaut)",
-        "final_confirm": "Confirmation finale : cela SUPPRIME des données. Continuer ?",
-
-        "archiving": "Archivage des rapports sélectionnés",
-        "archive_created": "Archive créée",
-        "zip_created": "Archive ZIP créée",
-
-        "deleting": "Suppression des tables dépendantes et des rapports",
-        "done": "Terminé.",
-        "dryrun_only": "Dry-run uniquement. Aucun changement appliqué.",
-        "cancelled": "Annulé. Aucune suppression appliquée.",
-        "logfile": "Fichier log",
-        "err": "ERREUR",
-        "connected_to": "Connecté à",
-    },
-
-    "IT": {
-        "title": "Manutenzione Database PingCastle",
-        "subtitle": "Pulizia Retention Mensile (Generazione / Ultimo report)",
-        "tagline": "Conserva il recente • 1/mese/dominio per il vecchio • Archiviazione/Eliminazione opzionali",
-        "author": "AUTHOR = Karim AZZOUZI",
-        "vendor": "VENDOR = Netwrix Corporation",
-
-        "language": "Lingua",
-        "invalid": "Input non valido, riprova.",
-        "press_enter": "Premi Invio per continuare",
-
-        "step": "Passo",
-        "sql_conn": "Connessione SQL Server",
-        "odbc_driver": "Driver ODBC installati (SQL Server)",
-        "select_driver": "Seleziona driver #",
-
-        "host": "Host SQL Server",
-        "instance": "Nome istanza (vuoto = predefinita)",
-        "port": "Porta TCP",
-        "db": "Nome database",
-        "auth": "Autenticazione [windows/sql]",
-        "user": "Username SQL",
-        "pwd": "Password SQL",
-        "encrypt": "Crittografare la connessione?",
-        "trust": "Considerare attendibile il certificato del server?",
-        "testing": "Test connessione...",
-        "test_ok": "Connessione OK.",
-        "test_fail": "Connessione fallita.",
-        "retry": "Riprovare impostazioni di connessione?",
-
-        "detect_reports": "Rilevamento tabella Reports PingCastle",
-        "detect_children": "Rilevamento tabelle dipendenti (FK verso Reports)",
-        "reports_found": "Tabella Reports trovata",
-        "children_found": "Tabelle dipendenti trovate",
-        "using_domain_name": "Colonna nome dominio rilevata",
-
-        "retention": "Impostazioni retention",
-        "choose_retention": "Scegli la soglia di retention",
-        "ret_1y": "1) 1 anno (365 giorni)",
-        "ret_6m": "2) 6 mesi (183 giorni)",
-        "ret_custom": "3) Giorni personalizzati",
-        "ret_prompt": "Selezione [1/2/3]",
-        "custom_days": "Inserisci i giorni di retention",
-
-        "logic_title": "Regola cliente",
-        "logic_body": (
-            "Data di riferimento = Generazione (aka 'Ultimo report').\n"
-            "• Report più recenti della soglia: MANTIENI TUTTO\n"
-            "• Report più vecchi della soglia: mantieni SOLO l'ultimo report del mese per dominio\n"
-            "  ed elimina gli extra settimanali."
-        ),
-
-        "plan": "Creazione piano di retention",
-        "loading_reports": "Caricamento report dal DB",
-        "summary": "Riepilogo Retention",
-        "total": "Report totali",
-        "cutoff": "Soglia (UTC)",
-        "old": "Report più vecchi della soglia (Generazione)",
-        "keep_recent": "Report mantenuti (recenti)",
-        "keep_monthly": "Report mantenuti (mensili per vecchi)",
-        "extras": "Report da rimuovere (extra)",
-
-        "per_domain": "Top domini con più rimozioni",
-        "domain": "Dominio",
-        "remove_count": "Da rimuovere",
-        "kept_old_monthly": "Mensili mantenuti (vecchi)",
-
-        "export_plan": "Esportazione piano (CSV)",
-        "plan_folder": "Cartella piano",
-        "plan_exported": "Piano esportato",
-
-        "preview_delete": "Anteprima: prime righe da rimuovere",
-        "no_extras": "Niente da rimuovere. Uscita.",
-        "safe_default_archive": "Directory archivio predefinita",
-        "action_old": "Per i report più vecchi della soglia: azione [archive/delete]",
-        "archive_dir": "Directory archivio",
-        "archive_fmt": "Formato archivio [jsonl/csv]",
-        "zip_q": "Creare archivio ZIP?",
-        "dryrun_prep": "Dry-run: preparazione set di eliminazione (nessuna modifica)",
-        "dryrun_table": "Dry-run: righe impattate per tabella",
-        "dryrun_ready": "Dry-run pronto. Report da rimuovere",
-        "apply": "Applicare ora? (Dry-run è predefinito)",
-        "final_confirm": "Conferma finale: questo ELIMINERÀ dati. Continuare?",
-
-        "archiving": "Archiviazione report selezionati",
-        "archive_created": "Archivio creato",
-        "zip_created": "ZIP archivio creato",
-
-        "deleting": "Eliminazione tabelle dipendenti e report",
-        "done": "Fatto.",
-        "dryrun_only": "Solo dry-run. Nessuna modifica applicata.",
-        "cancelled": "Annullato. Nessuna eliminazione applicata.",
-        "logfile": "File log",
-        "err": "ERRORE",
-        "connected_to": "Connesso a",
-    },
-
-    "DE": {
-        "title": "PingCastle Datenbankwartung",
-        "subtitle": "Monatliche Retention-Bereinigung (Generation / Letzter Report)",
-        "tagline": "Aktuelles behalten • Für alte Reports 1/Monat/Domäne • Optional archivieren/löschen",
-        "author": "AUTHOR = Karim AZZOUZI",
-        "vendor": "VENDOR = Netwrix Corporation",
-
-        "language": "Sprache",
-        "invalid": "Ungültige Eingabe, bitte erneut versuchen.",
-        "press_enter": "Drücken Sie Enter, um fortzufahren",
-
-        "step": "Schritt",
-        "sql_conn": "SQL Server Verbindung",
-        "odbc_driver": "Installierte ODBC-Treiber (SQL Server)",
-        "select_driver": "Treiber auswählen #",
-
-        "host": "SQL Server Host",
-        "instance": "Instanzname (leer = Standard)",
-        "port": "TCP-Port",
-        "db": "Datenbankname",
-        "auth": "Authentifizierung [windows/sql]",
-        "user": "SQL Benutzername",
-        "pwd": "SQL Passwort",
-        "encrypt": "Verbindung verschlüsseln?",
-        "trust": "Serverzertifikat vertrauen?",
-        "testing": "Verbindung wird getestet...",
-        "test_ok": "Verbindung OK.",
-        "test_fail": "Verbindung fehlgeschlagen.",
-        "retry": "Verbindungseinstellungen erneut eingeben?",
-
-        "detect_reports": "Erkennung der PingCastle Reports-Tabelle",
-        "detect_children": "Erkennung abhängiger Tabellen (FK zu Reports)",
-        "reports_found": "Reports-Tabelle gefunden",
-        "children_found": "Abhängige Tabellen gefunden",
-        "using_domain_name": "Spalte für Domänennamen erkannt",
-
-        "retention": "Retention-Einstellungen",
-        "choose_retention": "Retention-Schwelle wählen",
-        "ret_1y": "1) 1 Jahr (365 Tage)",
-        "ret_6m": "2) 6 Monate (183 Tage)",
-        "ret_custom": "3) Benutzerdefinierte Tage",
-        "ret_prompt": "Auswahl [1/2/3]",
-        "custom_days": "Retention-Tage eingeben",
-
-        "logic_title": "Kundenregel",
-        "logic_body": (
-            "Referenzdatum = Generation (aka 'Letzter Report').\n"
-            "• Reports neuer als die Schwelle: ALLE BEHALTEN\n"
-            "• Reports älter als die Schwelle: pro Monat und Domäne nur den neuesten Report behalten\n"
-            "  und die übrigen (wöchentlichen) löschen."
-        ),
-
-        "plan": "Retention-Plan wird erstellt",
-        "loading_reports": "Reports aus der DB werden geladen",
-        "summary": "Retention-Zusammenfassung",
-        "total": "Reports gesamt",
-        "cutoff": "Schwelle (UTC)",
-        "old": "Reports älter als die Schwelle (Generation)",
-        "keep_recent": "Behalten (neu)",
-        "keep_monthly": "Behalten (monatlich für alt)",
-        "extras": "Zu entfernen (Extras)",
-
-        "per_domain": "Top-Domänen mit den meisten Löschungen",
-        "domain": "Domäne",
-        "remove_count": "Zu entfernen",
-        "kept_old_monthly": "Monatlich behalten (alt)",
-
-        "export_plan": "Plan wird exportiert (CSV)",
-        "plan_folder": "Plan-Ordner",
-        "plan_exported": "Plan exportiert",
-
-        "preview_delete": "Vorschau: erste Zeilen zum Entfernen",
-        "no_extras": "Nichts zu entfernen. Beenden.",
-        "safe_default_archive": "Standard-Archivverzeichnis",
-        "action_old": "Für Reports älter als die Schwelle: Aktion [archive/delete]",
-        "archive_dir": "Archivverzeichnis",
-        "archive_fmt": "Archivformat [jsonl/csv]",
-        "zip_q": "ZIP-Archiv erstellen?",
-        "dryrun_prep": "Dry-run: Delete-Set wird vorbereitet (keine Änderungen)",
-        "dryrun_table": "Dry-run: betroffene Zeilen pro Tabelle",
-        "dryrun_ready": "Dry-run bereit. Reports zum Entfernen",
-        "apply": "Jetzt anwenden? (Dry-run ist Standard)",
-        "final_confirm": "Letzte Bestätigung: Daten werden GELÖSCHT. Fortfahren?",
-
-        "archiving": "Ausgewählte Reports werden archiviert",
-        "archive_created": "Archiv erstellt",
-        "zip_created": "ZIP-Archiv erstellt",
-
-        "deleting": "Abhängige Tabellen und Reports werden gelöscht",
-        "done": "Fertig.",
-        "dryrun_only": "Nur Dry-run. Keine Änderungen angewendet.",
-        "cancelled": "Abgebrochen. Keine Löschung durchgeführt.",
-        "logfile": "Logdatei",
-        "err": "FEHLER",
-        "connected_to": "Verbunden mit",
-    },
-
-    "ES": {
-        "title": "Mantenimiento de Base de Datos PingCastle",
-        "subtitle": "Limpieza de Retención Mensual (Generación / Último informe)",
-        "tagline": "Conservar lo reciente • 1/mes/dominio para lo antiguo • Archivar/Eliminar opcional",
-        "author": "AUTHOR = Karim AZZOUZI",
-        "vendor": "VENDOR = Netwrix Corporation",
-
-        "language": "Idioma",
-        "invalid": "Entrada no válida, inténtalo de nuevo.",
-        "press_enter": "Pulsa Enter para continuar",
-
-        "step": "Paso",
-        "sql_conn": "Conexión SQL Server",
-        "odbc_driver": "Drivers ODBC instalados (SQL Server)",
-        "select_driver": "Selecciona driver #",
-
-        "host": "Host SQL Server",
-        "instance": "Nombre de instancia (vacío = por defecto)",
-        "port": "Puerto TCP",
-        "db": "Nombre de la base",
-        "auth": "Autenticación [windows/sql]",
-        "user": "Usuario SQL",
-        "pwd": "Contraseña SQL",
-        "encrypt": "¿Cifrar la conexión?",
-        "trust": "¿Confiar en el certificado del servidor?",
-        "testing": "Probando conexión...",
-        "test_ok": "Conexión OK.",
-        "test_fail": "Conexión fallida.",
-        "retry": "¿Reintentar configuración de conexión?",
-
-        "detect_reports": "Detectando tabla Reports de PingCastle",
-        "detect_children": "Detectando tablas dependientes (FK a Reports)",
-        "reports_found": "Tabla Reports encontrada",
-        "children_found": "Tablas dependientes encontradas",
-        "using_domain_name": "Columna de nombre de dominio detectada",
-
-        "retention": "Configuración de retención",
-        "choose_retention": "Elige el umbral de retención",
-        "ret_1y": "1) 1 año (365 días)",
-        "ret_6m": "2) 6 meses (183 días)",
-        "ret_custom": "3) Días personalizados",
-        "ret_prompt": "Selección [1/2/3]",
-        "custom_days": "Introduce los días de retención",
-
-        "logic_title": "Regla del cliente",
-        "logic_body": (
-            "Fecha de referencia = Generación (aka 'Último informe').\n"
-            "• Informes más recientes que el umbral: CONSERVAR TODO\n"
-            "• Informes más antiguos que el umbral: conservar SOLO el informe más reciente del mes por dominio\n"
-            "  y eliminar los informes semanales extra."
-        ),
-
-        "plan": "Construyendo plan de retención",
-        "loading_reports": "Cargando informes desde la BD",
-        "summary": "Resumen de Retención",
-        "total": "Total de informes",
-        "cutoff": "Umbral (UTC)",
-        "old": "Informes más antiguos que el umbral (Generación)",
-        "keep_recent": "Informes conservados (recientes)",
-        "keep_monthly": "Informes conservados (mensuales para antiguos)",
-        "extras": "Informes a eliminar (extras)",
-
-        "per_domain": "Dominios con más eliminaciones",
-        "domain": "Dominio",
-        "remove_count": "A eliminar",
-        "kept_old_monthly": "Mensuales conservados (antiguos)",
-
-        "export_plan": "Exportando plan (CSV)",
-        "plan_folder": "Carpeta del plan",
-        "plan_exported": "Plan exportado",
-
-        "preview_delete": "Vista previa: primeras filas a eliminar",
-        "no_extras": "Nada que eliminar. Saliendo.",
-        "safe_default_archive": "Directorio de archivo por defecto",
-        "action_old": "Para informes más antiguos que el umbral: acción [archive/delete]",
-        "archive_dir": "Directorio de archivo",
-        "archive_fmt": "Formato de archivo [jsonl/csv]",
-        "zip_q": "¿Crear archivo ZIP?",
-        "dryrun_prep": "Dry-run: preparando conjunto de eliminación (sin cambios)",
-        "dryrun_table": "Dry-run: filas impactadas por tabla",
-        "dryrun_ready": "Dry-run listo. Informes a eliminar",
-        "apply": "¿Aplicar ahora? (Dry-run por defecto)",
-        "final_confirm": "Confirmación final: esto BORRARÁ datos. ¿Continuar?",
-
-        "archiving": "Archivando informes seleccionados",
-        "archive_created": "Archivo creado",
-        "zip_created": "ZIP creado",
-
-        "deleting": "Eliminando tablas dependientes e informes",
-        "done": "Hecho.",
-        "dryrun_only": "Solo dry-run. No se aplicaron cambios.",
-        "cancelled": "Cancelado. No se aplicó ninguna eliminación.",
-        "logfile": "Archivo log",
-        "err": "ERROR",
-        "connected_to": "Conectado a",
-    },
-}
-
-
-def tr(lang: str, key: str) -> str:
-    return T.get(lang, T["EN"]).get(key, T["EN"].get(key, key))
-
-
-# -------------------------
-# Logging
-# -------------------------
-def now_stamp() -> str:
-    return dt.datetime.now(dt.timezone.utc).strftime("%Y%m%d-%H%M%S")
-
-
-def log_path_default() -> str:
-    return f"PingCastleMaintenance-{now_stamp()}.log"
-
-
-def log_write(logfile: str, msg: str) -> None:
-    with open(logfile, "a", encoding="utf-8") as f:
-        f.write(msg.rstrip() + "\n")
-
-
-def ok(msg: str) -> None:
-    console.print(f"[bold green]✔[/bold green] {msg}")
-
-
-def warn(msg: str) -> None:
-    console.print(f"[bold yellow]⚠[/bold yellow] {msg}")
-
-
-def info(msg: str) -> None:
-    console.print(f"[bold cyan]▶[/bold cyan] {msg}")
-
-
-def err(msg: str) -> None:
-    console.print(f"[bold red]✖[/bold red] {msg}")
-
-
-# -------------------------
-# SQL structures
-# -------------------------
-@dataclass
-class ReportsTable:
-    schema: str
-    table: str
-
-    @property
-    def fq(self) -> str:
-        return f"{q(self.schema)}.{q(self.table)}"
-
-
-@dataclass
-class FKRef:
-    child_schema: str
-    child_table: str
-    child_column: str
-
-    @property
-    def child_fq(self) -> str:
-        return f"{q(self.child_schema)}.{q(self.child_table)}"
-
-
-def q(identifier: str) -> str:
-    return "[" + identifier.replace("]", "]]") + "]"
-
-
-# -------------------------
-# Connection builder
-# -------------------------
-def list_odbc_sqlserver_drivers() -> List[str]:
-    drivers = pyodbc.drivers()
-    preferred: List[str] = []
-    others: List[str] = []
-    for d in drivers:
-        if "SQL Server" in d or "ODBC Driver" in d or "Native Client" in d:
-            if "ODBC Driver 18" in d:
-                preferred.append(d)
-            elif "ODBC Driver 17" in d:
-                preferred.append(d)
-            else:
-                others.append(d)
-    ordered = preferred + [d for d in others if d not in preferred]
-    return ordered
-
-
-def choose_driver(lang: str) -> str:
-    drivers = list_odbc_sqlserver_drivers()
-    if not drivers:
-        raise RuntimeError("No SQL Server ODBC driver found.")
-
-    table = Table(title=tr(lang, "odbc_driver"), show_lines=True)
-    table.add_column("#", justify="right", style="bold")
-    table.add_column("Driver name", overflow="fold")
-    for i, d in enumerate(drivers, 1):
-        table.add_row(str(i), d)
-    console.print(table)
-
-    default_idx = 1
-    for i, d in enumerate(drivers, 1):
-        if "ODBC Driver 18 for SQL Server" in d:
-            default_idx = i
-            break
-        if "ODBC Driver 17 for SQL Server" in d:
-            default_idx = i
-
-    while True:
-        s = Prompt.ask(tr(lang, "select_driver"), default=str(default_idx)).strip()
-        if s.isdigit() and 1 <= int(s) <= len(drivers):
-            return drivers[int(s) - 1]
-        warn(tr(lang, "invalid"))
-
-
-def build_server(host: str, instance: str, port: int) -> str:
-    host = host.strip()
-    instance = instance.strip()
-    if instance:
-        if port and port != 1433:
-            return f"{host}\\{instance},{port}"
-        return f"{host}\\{instance}"
-    if port:
-        return f"tcp:{host},{port}"
-    return f"tcp:{host},1433"
-
-
-def connect_sqlserver_interactive(lang: str, logfile: str) -> Tuple[pyodbc.Connection, str]:
-    driver = choose_driver(lang)
-
-    host = Prompt.ask(tr(lang, "host"), default=os.environ.get("COMPUTERNAME", "localhost"))
-    instance = Prompt.ask(tr(lang, "instance"), default="").strip()
-    port_s = Prompt.ask(tr(lang, "port"), default="1433")
-    try:
-        port = int(port_s.strip())
-    except Exception:
-        port = 1433
-
-    db = Prompt.ask(tr(lang, "db"), default="PingCastleEnterprise")
-    auth = Prompt.ask(tr(lang, "auth"), default="windows").strip().lower()
-    if auth not in ("windows", "sql"):
-        auth = "windows"
-
-    encrypt = Confirm.ask(tr(lang, "encrypt"), default=True)
-    trust = Confirm.ask(tr(lang, "trust"), default=True)
-
-    uid = ""
-    pwd = ""
-    if auth == "sql":
-        uid = Prompt.ask(tr(lang, "user"), default="")
-        pwd = getpass.getpass(tr(lang, "pwd") + ": ")
-
-    server = build_server(host, instance, port)
-
-    parts = [
-        f"DRIVER={{{driver}}}",
-        f"SERVER={server}",
-        f"DATABASE={db}",
-        "Connection Timeout=30",
-        "Application Name=PingCastleMaintenance",
-    ]
-    parts.append("Encrypt=yes" if encrypt else "Encrypt=no")
-    parts.append(f"TrustServerCertificate={'yes' if trust else 'no'}")
-
-    if auth == "windows":
-        parts.append("Trusted_Connection=yes")
-    else:
-        parts.append(f"UID={uid}")
-        parts.append(f"PWD={pwd}")
-
-    conn_str = ";".join(parts) + ";"
-
-    info(tr(lang, "testing"))
-    conn = pyodbc.connect(conn_str, autocommit=False)
-    ok(tr(lang, "test_ok"))
-    ok(f"{tr(lang, 'connected_to')} {server}  |  DB={db}")
-    log_write(logfile, f"[conn] OK server={server} db={db} auth={auth} driver={driver}")
-    return conn, conn_str
-
-
-# -------------------------
-# Schema detection
-# -------------------------
-def detect_reports_table(cur) -> ReportsTable:
-    cur.execute(
-        """
-        SELECT s.name AS schema_name, t.name AS table_name
-        FROM sys.tables t
-        JOIN sys.schemas s ON t.schema_id = s.schema_id
-        WHERE t.name = 'Reports'
-        """
-    )
-    rows = cur.fetchall()
-    if not rows:
-        raise RuntimeError("Reports table not found.")
-
-    best: Optional[ReportsTable] = None
-    best_score = -1
-
-    for r in rows:
-        schema, table = r[0], r[1]
-        cur.execute(
-            """
-            SELECT c.name
-            FROM sys.columns c
-            JOIN sys.tables t ON c.object_id = t.object_id
-            JOIN sys.schemas s ON t.schema_id = s.schema_id
-            WHERE s.name = ? AND t.name = ?
-            """,
-            schema, table,
-        )
-        cols = {x[0] for x in cur.fetchall()}
-        score = 0
-        for needed in ("ID", "DomainID", "ImportedDate", "RawData", "Generation"):
-            if needed in cols:
-                score += 5
-        if score > best_score:
-            best_score = score
-            best = ReportsTable(schema=schema, table=table)
-
-    if not best:
-        raise RuntimeError("Unable to select Reports table.")
-    return best
-
-
-def detect_domains_table(cur) -> Tuple[str, str]:
-    cur.execute(
-        """
-        SELECT s.name AS schema_name, t.name AS table_name
-        FROM sys.tables t
-        JOIN sys.schemas s ON t.schema_id = s.schema_id
-        WHERE t.name = 'Domains'
-        """
-    )
-    r = cur.fetchone()
-    if not r:
-        raise RuntimeError("Domains table not found.")
-    return r[0], r[1]
-
-
-def detect_report_name_source(cur) -> Tuple[str, str, str]:
-    dom_schema, dom_table = detect_domains_table(cur)
-
-    for candidate in ("Name", "NetBiosName"):
-        cur.execute(
-            """
-            SELECT 1
-            FROM sys.columns c
-            JOIN sys.tables t ON c.object_id = t.object_id
-            JOIN sys.schemas s ON t.schema_id = s.schema_id
-            WHERE s.name = ? AND t.name = ? AND c.name = ?
-            """,
-            dom_schema, dom_table, candidate,
-        )
-        if cur.fetchone():
-            return dom_schema, dom_table, candidate
-
-    return dom_schema, dom_table, "ID"
-
-
-def detect_dependent_tables(cur, reports: ReportsTable) -> List[FKRef]:
-    cur.execute(
-        """
-        ;WITH fk AS (
-            SELECT
-                sch_child.name AS child_schema,
-                t_child.name AS child_table,
-                c_child.name AS child_column,
-                sch_parent.name AS parent_schema,
-                t_parent.name AS parent_table
-            FROM sys.foreign_keys fk
-            JOIN sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
-            JOIN sys.tables t_child ON fkc.parent_object_id = t_child.object_id
-            JOIN sys.schemas sch_child ON t_child.schema_id = sch_child.schema_id
-            JOIN sys.columns c_child ON c_child.object_id = t_child.object_id AND c_child.column_id = fkc.parent_column_id
-            JOIN sys.tables t_parent ON fkc.referenced_object_id = t_parent.object_id
-            JOIN sys.schemas sch_parent ON t_parent.schema_id = sch_parent.schema_id
-        )
-        SELECT child_schema, child_table, child_column
-        FROM fk
-        WHERE parent_schema = ? AND parent_table = ?
-        ORDER BY child_schema, child_table, child_column
-        """,
-        reports.schema, reports.table,
-    )
-    return [FKRef(child_schema=r[0], child_table=r[1], child_column=r[2]) for r in cur.fetchall()]
-
-
-# -------------------------
-# Retention logic (Generation / Last report)
-# -------------------------
-@dataclass
-class ReportRow:
-    id: int
-    domain_id: int
-    domain_name: str
-    imported: dt.datetime
-    generation: dt.datetime
-
-
-def utc_now() -> dt.datetime:
-    return dt.datetime.now(dt.timezone.utc)
-
-
-def normalize_dt(value) -> dt.datetime:
-    if isinstance(value, dt.datetime):
-        if value.tzinfo is None:
-            return value.replace(tzinfo=dt.timezone.utc)
-        return value.astimezone(dt.timezone.utc)
-    raise TypeError("Unsupported datetime value")
-
-
-def month_key_from_generation(d: dt.datetime) -> str:
-    return f"{d.year:04d}-{d.month:02d}"
-
-
-def load_reports(cur, reports: ReportsTable, dom_schema: str, dom_table: str, dom_name_col: str) -> List[ReportRow]:
-    sql = f"""
-    SELECT r.ID, r.DomainID, d.{q(dom_name_col)} AS DomainName, r.ImportedDate, r.Generation
-    FROM {reports.fq} r
-    JOIN {q(dom_schema)}.{q(dom_table)} d ON d.ID = r.DomainID
-    ORDER BY r.Generation ASC, r.ID ASC
-    """
-    cur.execute(sql)
-    out: List[ReportRow] = []
-    for rid, did, dname, imported, gen in cur.fetchall():
-        if gen is None:
-            # Defensive: if Generation is NULL, skip (cannot apply customer rule safely).
-            # Better: include it as "old" or "recent"? Here: skip + log later.
-            continue
-        out.append(
-            ReportRow(
-                id=int(rid),
-                domain_id=int(did),
-                domain_name=str(dname),
-                imported=normalize_dt(imported),
-                generation=normalize_dt(gen),
-            )
-        )
-    return out
-
-
-def compute_plan_monthly_over_cutoff(
-    reports: List[ReportRow],
-    cutoff_days: int,
-) -> Tuple[dt.datetime, List[ReportRow], List[ReportRow], List[ReportRow]]:
-    cutoff = utc_now() - dt.timedelta(days=cutoff_days)
-
-    keep_recent: List[ReportRow] = []
-    old: List[ReportRow] = []
-
-    for r in reports:
-        if r.generation >= cutoff:
-            keep_recent.append(r)
-        else:
-            old.append(r)
-
-    # For OLD reports: keep latest per (domain, month) based on Generation
-    best: Dict[Tuple[int, str], ReportRow] = {}
-    for r in old:
-        k = (r.domain_id, month_key_from_generation(r.generation))
-        cur_best = best.get(k)
-        if cur_best is None or (r.generation, r.id) > (cur_best.generation, cur_best.id):
-            best[k] = r
-
-    keep_monthly = sorted(best.values(), key=lambda x: (x.generation, x.id))
-    keep_ids = {r.id for r in keep_recent} | {r.id for r in keep_monthly}
-
-    delete_extras = [r for r in old if r.id not in keep_ids]
-    delete_extras.sort(key=lambda x: (x.generation, x.id))
-
-    keep_recent.sort(key=lambda x: (x.generation, x.id))
-    return cutoff, keep_recent, keep_monthly, delete_extras
-
-
-# -------------------------
-# Exports
-# -------------------------
-def ensure_dir(path: str) -> None:
-    os.makedirs(path, exist_ok=True)
-
-
-def safe_default_archive_dir() -> str:
-    return r"C:\PingCastleArchive"
-
-
-def export_csv(path: str, rows: List[ReportRow]) -> None:
-    with open(path, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f, delimiter=";")
-        w.writerow(["ID", "DomainID", "DomainName", "ImportedDateUTC", "GenerationUTC", "Month(Generation)"])
-        for r in rows:
-            w.writerow(
-                [
-                    r.id,
-                    r.domain_id,
-                    r.domain_name,
-                    r.imported.isoformat(),
-                    r.generation.isoformat(),
-                    month_key_from_generation(r.generation),
-                ]
-            )
-
-
-def export_all_plan(
-    folder: str,
-    reports_all: List[ReportRow],
-    keep_recent: List[ReportRow],
-    keep_monthly: List[ReportRow],
-    delete_extras: List[ReportRow],
-) -> Dict[str, str]:
-    ensure_dir(folder)
-    p_all = os.path.join(folder, "ALL_Reports.csv")
-    p_recent = os.path.join(folder, "KEEP_Recent.csv")
-    p_monthly = os.path.join(folder, "KEEP_Monthly.csv")
-    p_delete = os.path.join(folder, "DELETE_Extras.csv")
-
-    export_csv(p_all, reports_all)
-    export_csv(p_recent, keep_recent)
-    export_csv(p_monthly, keep_monthly)
-    export_csv(p_delete, delete_extras)
-
-    return {"ALL": p_all, "KEEP_Recent": p_recent, "KEEP_Monthly": p_monthly, "DELETE_Extras": p_delete}
-
-
-def export_archive_jsonl(cur, reports_table: ReportsTable, report_ids: List[int], out_dir: str) -> str:
-    ensure_dir(out_dir)
-    out_file = os.path.join(out_dir, "ReportsArchive.jsonl")
-    sql = f"SELECT ID, DomainID, ImportedDate, Generation, RawData FROM {reports_table.fq} WHERE ID = ?"
-
-    with open(out_file, "w", encoding="utf-8") as f:
-        for rid in report_ids:
-            cur.execute(sql, rid)
-            row = cur.fetchone()
-            if not row:
-                continue
-            raw = row[4]
-            raw_b64 = base64.b64encode(raw).decode("ascii") if raw is not None else None
-            payload = {
-                "ID": int(row[0]),
-                "DomainID": int(row[1]),
-                "ImportedDate": normalize_dt(row[2]).isoformat(),
-                "Generation": normalize_dt(row[3]).isoformat() if row[3] else None,
-                "RawDataBase64": raw_b64,
-            }
-            f.write(json.dumps(payload, ensure_ascii=False) + "\n")
-    return out_file
-
-
-def export_archive_csv(cur, reports_table: ReportsTable, report_ids: List[int], out_dir: str) -> str:
-    ensure_dir(out_dir)
-    out_file = os.path.join(out_dir, "ReportsArchive.csv")
-    sql = f"SELECT ID, DomainID, ImportedDate, Generation FROM {reports_table.fq} WHERE ID = ?"
-
-    with open(out_file, "w", newline="", encoding="utf-8") as f:
-        w = csv.writer(f, delimiter=";")
-        w.writerow(["ID", "DomainID", "ImportedDateUTC", "GenerationUTC"])
-        for rid in report_ids:
-            cur.execute(sql, rid)
-            row = cur.fetchone()
-            if not row:
-                continue
-            w.writerow(
-                [
-                    int(row[0]),
-                    int(row[1]),
-                    normalize_dt(row[2]).isoformat(),
-                    normalize_dt(row[3]).isoformat() if row[3] else "",
-                ]
-            )
-    return out_file
-
-
-def zip_folder(folder: str, zip_path: str) -> None:
-    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as z:
-        for root, _, files in os.walk(folder):
-            for fn in files:
-                full = os.path.join(root, fn)
-                rel = os.path.relpath(full, folder)
-                z.write(full, rel)
-
-
-# -------------------------
-# Delete logic
-# -------------------------
-def create_delete_ids_temp(cur, ids: List[int]) -> None:
-    cur.execute("IF OBJECT_ID('tempdb..#PC_DeleteIds') IS NOT NULL DROP TABLE #PC_DeleteIds;")
-    cur.execute("CREATE TABLE #PC_DeleteIds (ID INT NOT NULL PRIMARY KEY);")
-    if ids:
-        cur.fast_executemany = True
-        cur.executemany("INSERT INTO #PC_DeleteIds (ID) VALUES (?);", [(i,) for i in ids])
-
-
-def update_domains_first_last(cur, reports: ReportsTable, dom_schema: str, dom_table: str) -> None:
-    dom_fq = f"{q(dom_schema)}.{q(dom_table)}"
-    sql = f"""
-    ;WITH remaining AS (
-        SELECT r.DomainID, r.ID, r.Generation
-        FROM {reports.fq} r
-        WHERE NOT EXISTS (SELECT 1 FROM #PC_DeleteIds d WHERE d.ID = r.ID)
-    ),
-    agg AS (
-        SELECT DomainID,
-               COUNT(1) AS Cnt,
-               MIN(Generation) AS MinDt,
-               MAX(Generation) AS MaxDt
-        FROM remaining
-        GROUP BY DomainID
-    ),
-    first_last AS (
-        SELECT a.DomainID,
-               a.Cnt,
-               firstR.ID AS FirstReportID_New,
-               lastR.ID AS LastReportID_New
-        FROM agg a
-        OUTER APPLY (
-            SELECT TOP 1 ID
-            FROM remaining r
-            WHERE r.DomainID = a.DomainID AND r.Generation = a.MinDt
-            ORDER BY r.ID ASC
-        ) firstR
-        OUTER APPLY (
-            SELECT TOP 1 ID
-            FROM remaining r
-            WHERE r.DomainID = a.DomainID AND r.Generation = a.MaxDt
-            ORDER BY r.ID DESC
-        ) lastR
-    )
-    UPDATE d
-        SET d.FirstReportID = fl.FirstReportID_New,
-            d.LastReportID  = fl.LastReportID_New,
-            d.NumberOfReport = fl.Cnt
-    FROM {dom_fq} d
-    LEFT JOIN first_last fl ON fl.DomainID = d.ID;
-    """
-    cur.execute(sql)
-
-
-def delete_children_then_reports(cur, reports: ReportsTable, deps: List[FKRef]) -> Dict[str, int]:
-    counts: Dict[str, int] = {}
-    for ref in deps:
-        sql = f"DELETE FROM {ref.child_fq} WHERE {q(ref.child_column)} IN (SELECT ID FROM #PC_DeleteIds);"
-        cur.execute(sql)
-        counts[str(ref.child_fq)] = counts.get(str(ref.child_fq), 0) + cur.rowcount
-
-    cur.execute(f"DELETE FROM {reports.fq} WHERE ID IN (SELECT ID FROM #PC_DeleteIds);")
-    counts[str(reports.fq)] = counts.get(str(reports.fq), 0) + cur.rowcount
-    return counts
-
-
-def dryrun_counts(cur, reports: ReportsTable, deps: List[FKRef]) -> List[Tuple[str, int]]:
-    rows: List[Tuple[str, int]] = []
-    cur.execute(f"SELECT COUNT(1) FROM {reports.fq} WHERE ID IN (SELECT ID FROM #PC_DeleteIds);")
-    rows.append((str(reports.fq), int(cur.fetchone()[0])))
-
-    for ref in deps:
-        cur.execute(f"SELECT COUNT(1) FROM {ref.child_fq} WHERE {q(ref.child_column)} IN (SELECT ID FROM #PC_DeleteIds);")
-        rows.append((str(ref.child_fq), int(cur.fetchone()[0])))
-    return rows
-
-
-# -------------------------
-# UI helpers
-# -------------------------
-def show_header(lang: str) -> None:
-    title = Text(tr(lang, "title"), style="bold white")
-    subtitle = Text(tr(lang, "subtitle"), style="bold cyan")
-    tagline = Text(tr(lang, "tagline"), style="dim")
-    author = Text(tr(lang, "author") + "    " + tr(lang, "vendor"), style="dim")
-    sysline = Text(f"{platform.system()} {platform.release()} • Python {platform.python_version()}", style="dim")
-
-    content = Text.assemble(title, "\n", subtitle, "\n", tagline, "\n", author, "\n", sysline)
-    panel = Panel(Align.center(content), border_style="bright_cyan")
-    console.print(panel)
-
-
-def step_rule(lang: str, n: int, label: str) -> None:
-    console.print(Rule(f"[bold cyan]{tr(lang, 'step')} {n}[/bold cyan] • {label}"))
-
-
-def progress_run(label: str, func):
-    with Progress(
-        SpinnerColumn(),
-        TextColumn("[progress.description]{task.description}"),
-        BarColumn(),
-        TimeElapsedColumn(),
-        console=console,
-        transient=True,
-    ) as p:
-        t = p.add_task(label, total=None)
-        result = func()
-        p.update(t, completed=1)
-        return result
-
-
-def show_summary(lang: str, total: int, cutoff: dt.datetime, old: int, keep_recent: int, keep_monthly: int, extras: int) -> None:
-    tb = Table(title=tr(lang, "summary"), show_lines=True)
-    tb.add_column("Metric")
-    tb.add_column("Value", justify="right")
-
-    tb.add_row(tr(lang, "total"), str(total))
-    tb.add_row(tr(lang, "cutoff"), cutoff.isoformat())
-    tb.add_row(tr(lang, "old"), str(old))
-    tb.add_row(tr(lang, "keep_recent"), str(keep_recent))
-    tb.add_row(tr(lang, "keep_monthly"), str(keep_monthly))
-    tb.add_row(tr(lang, "extras"), str(extras))
-
-    console.print(tb)
-
-
-def show_dryrun_table(lang: str, rows: List[Tuple[str, int]]) -> None:
-    tb = Table(title=tr(lang, "dryrun_table"), show_lines=True)
-    tb.add_column("Table", overflow="fold")
-    tb.add_column("Rows", justify="right")
-    for name, cnt in rows:
-        tb.add_row(name, str(cnt))
-    console.print(tb)
-
-
-def top_removals_by_domain(delete_extras: List[ReportRow], keep_monthly: List[ReportRow], topn: int = 10) -> List[Tuple[str, int, int]]:
-    remove_counts: Dict[str, int] = {}
-    kept_counts: Dict[str, int] = {}
-
-    for r in delete_extras:
-        remove_counts[r.domain_name] = remove_counts.get(r.domain_name, 0) + 1
-    for r in keep_monthly:
-        kept_counts[r.domain_name] = kept_counts.get(r.domain_name, 0) + 1
-
-    merged = []
-    for dom, cnt in remove_counts.items():
-        merged.append((dom, cnt, kept_counts.get(dom, 0)))
-
-    merged.sort(key=lambda x: x[1], reverse=True)
-    return merged[:topn]
-
-
-def show_domain_table(lang: str, rows: List[Tuple[str, int, int]]) -> None:
-    tb = Table(title=tr(lang, "per_domain"), show_lines=True)
-    tb.add_column(tr(lang, "domain"), overflow="fold")
-    tb.add_column(tr(lang, "remove_count"), justify="right")
-    tb.add_column(tr(lang, "kept_old_monthly"), justify="right")
-    for dom, rm, kept in rows:
-        tb.add_row(dom, str(rm), str(kept))
-    console.print(tb)
-
-
-def show_preview_delete(lang: str, delete_extras: List[ReportRow], limit: int = 12) -> None:
-    tb = Table(title=tr(lang, "preview_delete"), show_lines=False)
-    tb.add_column("ID", justify="right")
-    tb.add_column("Domain", overflow="fold")
-    tb.add_column("Generation (UTC)", overflow="fold")
-    tb.add_column("Month", justify="center")
-
-    for r in delete_extras[:limit]:
-        tb.add_row(str(r.id), r.domain_name, r.generation.isoformat(), month_key_from_generation(r.generation))
-    console.print(tb)
-
-
-# -------------------------
-# Main prompts
-# -------------------------
-def choose_language() -> str:
-    while True:
-        lang = Prompt.ask("Language [EN/FR/IT/DE/ES]", default="FR").strip().upper()
-        if lang in LANGS:
-            return lang
-        console.print("Invalid language. Use EN/FR/IT/DE/ES.")
-
-
-def choose_retention_days(lang: str) -> int:
-    console.print(Panel(tr(lang, "retention"), border_style="cyan"))
-    console.print(tr(lang, "ret_1y"))
-    console.print(tr(lang, "ret_6m"))
-    console.print(tr(lang, "ret_custom"))
-    while True:
-        s = Prompt.ask(tr(lang, "ret_prompt"), default="1").strip()
-        if s == "1":
-            return 365
-        if s == "2":
-            return 183
-        if s == "3":
-            d = Prompt.ask(tr(lang, "custom_days"), default="365").strip()
-            if d.isdigit() and int(d) > 0:
-                return int(d)
-        warn(tr(lang, "invalid"))
-
-
-def validate_writable_dir(path: str) -> bool:
-    try:
-        ensure_dir(path)
-        testfile = os.path.join(path, f".write_test_{os.getpid()}.tmp")
-        with open(testfile, "w", encoding="utf-8") as f:
-            f.write("ok")
-        os.remove(testfile)
-        return True
-    except Exception:
-        return False
-
-
-# -------------------------
-# Main
-# -------------------------
-def main() -> int:
-    logfile = log_path_default()
-    log_write(logfile, "=== PingCastle Maintenance START ===")
-
-    lang = choose_language()
-    show_header(lang)
-
-    console.print(Panel(tr(lang, "logic_body"), title=tr(lang, "logic_title"), border_style="cyan"))
-
-    step_rule(lang, 1, tr(lang, "sql_conn"))
-
-    while True:
-        try:
-            conn, _ = connect_sqlserver_interactive(lang, logfile)
-            break
-        except Exception as e:
-            err(tr(lang, "test_fail"))
-            err(str(e))
-            log_write(logfile, f"[conn] FAIL: {e}")
-            if not Confirm.ask(tr(lang, "retry"), default=True):
-                console.print(f"{tr(lang, 'logfile')}: {logfile}")
-                return 2
-
-    cur = conn.cursor()
-
-    step_rule(lang, 2, tr(lang, "detect_reports"))
-    reports = progress_run(tr(lang, "detect_reports"), lambda: detect_reports_table(cur))
-    ok(f"{tr(lang, 'reports_found')}: {reports.fq}")
-    log_write(logfile, f"[detect] Reports={reports.fq}")
-
-    dom_schema, dom_table, dom_name_col = detect_report_name_source(cur)
-    ok(f"{tr(lang, 'using_domain_name')}: {q(dom_schema)}.{q(dom_table)}.{q(dom_name_col)}")
-    log_write(logfile, f"[detect] Domains={q(dom_schema)}.{q(dom_table)} namecol={dom_name_col}")
-
-    step_rule(lang, 3, tr(lang, "detect_children"))
-    deps = progress_run(tr(lang, "detect_children"), lambda: detect_dependent_tables(cur, reports))
-    ok(f"{tr(lang, 'children_found')}: {len(deps)}")
-    log_write(logfile, f"[detect] deps={len(deps)}")
-
-    step_rule(lang, 4, tr(lang, "retention"))
-    cutoff_days = choose_retention_days(lang)
-
-    step_rule(lang, 5, tr(lang, "plan"))
-    reports_all = progress_run(tr(lang, "loading_reports"), lambda: load_reports(cur, reports, dom_schema, dom_table, dom_name_col))
-    cutoff, keep_recent, keep_monthly, delete_extras = compute_plan_monthly_over_cutoff(reports_all, cutoff_days)
-
-    old_count = sum(1 for r in reports_all if r.generation < cutoff)
-
-    show_summary(
-        lang,
-        total=len(reports_all),
-        cutoff=cutoff,
-        old=old_count,
-        keep_recent=len(keep_recent),
-        keep_monthly=len(keep_monthly),
-        extras=len(delete_extras),
-    )
-
-    domain_rows = top_removals_by_domain(delete_extras, keep_monthly, topn=10)
-    if domain_rows:
-        show_domain_table(lang, domain_rows)
-
-    if delete_extras:
-        show_preview_delete(lang, delete_extras, limit=12)
-
-    step_rule(lang, 6, tr(lang, "export_plan"))
-    plan_folder = os.path.join(os.getcwd(), f"PingCastlePlan-{now_stamp()}")
-    paths = export_all_plan(plan_folder, reports_all, keep_recent, keep_monthly, delete_extras)
-    ok(tr(lang, "plan_exported"))
-    console.print(f"{tr(lang, 'plan_folder')}: [bold]{plan_folder}[/bold]")
-    console.print(f"  ALL:            {paths['ALL']}")
-    console.print(f"  KEEP recent:     {paths['KEEP_Recent']}")
-    console.print(f"  KEEP monthly:    {paths['KEEP_Monthly']}")
-    console.print(f"  DELETE extras:   {paths['DELETE_Extras']}")
-    log_write(logfile, f"[plan] folder={plan_folder}")
-
-    if not delete_extras:
-        ok(tr(lang, "no_extras"))
-        conn.rollback()
-        console.print(f"{tr(lang, 'logfile')}: {logfile}")
-        return 0
-
-    default_archive = safe_default_archive_dir()
-    console.print(f"\n[dim]{tr(lang, 'safe_default_archive')}: {default_archive}[/dim]\n")
-
-    # Default prompt must show archive/delete
-    action = Prompt.ask(tr(lang, "action_old"), default="archive/delete").strip().lower()
-    if action not in ("archive", "delete"):
-        action = "archive"
-
-    archive_dir = ""
-    archive_fmt = "jsonl"
-    make_zip = True
-
-    if action == "archive":
-        archive_dir = Prompt.ask(tr(lang, "archive_dir"), default=default_archive).strip()
-        while not validate_writable_dir(archive_dir):
-            warn(f"{tr(lang, 'archive_dir')} not writable. Please choose another path.")
-            archive_dir = Prompt.ask(tr(lang, "archive_dir"), default=default_archive).strip()
-
-        archive_fmt = Prompt.ask(tr(lang, "archive_fmt"), default="jsonl").strip().lower()
-        if archive_fmt not in ("jsonl", "csv"):
-            archive_fmt = "jsonl"
-
-        make_zip = Confirm.ask(tr(lang, "zip_q"), default=True)
-
-    step_rule(lang, 7, tr(lang, "dryrun_prep"))
-
-    ids_to_delete = [r.id for r in delete_extras]
-    create_delete_ids_temp(cur, ids_to_delete)
-    counts = dryrun_counts(cur, reports, deps)
-    show_dryrun_table(lang, counts)
-    ok(f"{tr(lang, 'dryrun_ready')}: {len(ids_to_delete)}")
-    log_write(logfile, f"[dryrun] delete_reports={len(ids_to_delete)}")
-
-    if not Confirm.ask(tr(lang, "apply"), default=False):
-        ok(tr(lang, "dryrun_only"))
-        conn.rollback()
-        log_write(logfile, "Dry-run only. ROLLBACK.")
-        console.print(f"{tr(lang, 'logfile')}: {logfile}")
-        return 0
-
-    try:
-        # Archive first
-        if action == "archive":
-            step_rule(lang, 8, tr(lang, "archiving"))
-            out_folder = os.path.join(archive_dir, f"PingCastleArchive-{now_stamp()}")
-            ensure_dir(out_folder)
-
-            def do_archive():
-                if archive_fmt == "jsonl":
-                    return export_archive_jsonl(cur, reports, ids_to_delete, out_folder)
-                return export_archive_csv(cur, reports, ids_to_delete, out_folder)
-
-            archive_file = progress_run("Exporting archive", do_archive)
-            ok(f"{tr(lang, 'archive_created')}: {archive_file}")
-
-            if make_zip:
-                zip_path = out_folder + ".zip"
-                zip_folder(out_folder, zip_path)
-                ok(f"{tr(lang, 'zip_created')}: {zip_path}")
-                log_write(logfile, f"[archive] zip={zip_path}")
-            else:
-                log_write(logfile, f"[archive] folder={out_folder}")
-
-        # Final confirmation
-        step_rule(lang, 9, tr(lang, "deleting"))
-        if not Confirm.ask(tr(lang, "final_confirm"), default=False):
-            ok(tr(lang, "cancelled"))
-            conn.rollback()
-            log_write(logfile, "Cancelled before delete. ROLLBACK.")
-            console.print(f"{tr(lang, 'logfile')}: {logfile}")
-            return 0
-
-        # Ensure temp table exists and pointers are fixed
-        create_delete_ids_temp(cur, ids_to_delete)
-        update_domains_first_last(cur, reports, dom_schema, dom_table)
-
-        def do_delete():
-            return delete_children_then_reports(cur, reports, deps)
-
-        with Progress(SpinnerColumn(), TextColumn("{task.description}"), TimeElapsedColumn(), console=console) as p:
-            t = p.add_task("Deleting...", total=None)
-            deleted = do_delete()
-            p.update(t, completed=1)
-
-        conn.commit()
-        ok(tr(lang, "done"))
-        log_write(logfile, f"[delete] committed. deleted={deleted}")
-
-    except Exception as e:
-        conn.rollback()
-        err(f"{tr(lang, 'err')}: {e}")
-        log_write(logfile, "[EXCEPTION]")
-        log_write(logfile, traceback.format_exc())
-        console.print(f"{tr(lang, 'logfile')}: {logfile}")
-        return 3
-
-    console.print(f"{tr(lang, 'logfile')}: {logfile}")
-    return 0
-
-
-if __name__ == "__main__":
-    raise SystemExit(main())
-
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+PingCastle Database Maintenance
+Monthly Retention Cleanup (based on report Generation / "Last report")
+
+Main :
+- Weekly scans for years
+- Keep ALL reports for the last N days (e.g. 1 year)
+- For reports OLDER than N days: keep ONLY ONE report per month per domain
+  (the latest report of that month based on Generation / "Last report")
+- Dry-run by default, optional archive, optional delete
+
+AUTHOR = Karim AZZOUZI
+VENDOR = Netwrix Corporation
+"""
+
+from __future__ import annotations
+
+import atexit
+import datetime as dt
+import functools
+import io
+import os
+import platform
+import traceback
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple, Iterable
+
+# -------------------------
+# Dependencies
+# -------------------------
+try:
+    import pyodbc  # type: ignore
+except Exception:
+    print("Missing dependency: pyodbc")
+    raise
+
+try:
+    from rich.console import Console
+    from rich.panel import Panel
+    from rich.table import Table
+    from rich.prompt import Prompt, Confirm
+    from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeElapsedColumn
+    from rich.align import Align
+    from rich.text import Text
+    from rich.rule import Rule
+except Exception:
+    print("Missing dependency: rich")
+    raise
+
+console = Console()
+
+# -------------------------
+# i18n
+# -------------------------
+LANGS = ["EN", "FR", "IT", "DE", "ES"]
+
+T: Dict[str, Dict[str, str]] = {
+    "EN": {
+        "title": "PingCastle Database Maintenance",
+        "subtitle": "Monthly Retention Cleanup (Generation / Last report)",
+        "tagline": "Keep everything recent • Keep 1 per month per domain for old reports • Optional archive/delete",
+        "author": "AUTHOR = Karim AZZOUZI",
+        "vendor": "VENDOR = Netwrix Corporation",
+
+        "language": "Language",
+        "invalid": "Invalid input, please retry.",
+        "press_enter": "Press Enter to continue",
+
+        "step": "Step",
+        "sql_conn": "SQL Server connection",
+        "odbc_driver": "Installed ODBC drivers (SQL Server)",
+        "select_driver": "Select driver #",
+
+        "host": "SQL Server host",
+        "instance": "Instance name (blank for default)",
+        "port": "TCP port",
+        "db": "Database name",
+        "auth": "Authentication [windows/sql]",
+        "user": "SQL username",
+        "pwd": "SQL password",
+        "encrypt": "Encrypt connection?",
+        "trust": "Trust server certificate?",
+        "testing": "Testing connection...",
+        "test_ok": "Connection OK.",
+        "test_fail": "Connection failed.",
+        "retry": "Retry connection settings?",
+
+        "detect_reports": "Detecting PingCastle Reports table",
+        "detect_children": "Detecting dependent tables (FK to Reports)",
+        "reports_found": "Reports table found",
+        "children_found": "Dependent tables found",
+        "using_domain_name": "Domain name column detected",
+
+        "retention": "Retention settings",
+        "choose_retention": "Choose retention threshold",
+        "ret_1y": "1) 1 year (365 days)",
+        "ret_6m": "2) 6 months (183 days)",
+        "ret_custom": "3) Custom days",
+        "ret_prompt": "Selection [1/2/3]",
+        "custom_days": "Enter retention days",
+
+        "logic_title": "Customer rule",
+        "logic_body": (
+            "Reference date = Generation (aka 'Last report').\n"
+            "• Reports newer than the threshold: KEEP ALL\n"
+            "• Reports older than the threshold: KEEP ONLY the latest report per month per domain\n"
+            "  and REMOVE the extra weekly reports."
+        ),
+
+        "plan": "Building retention plan",
+        "loading_reports": "Loading reports from DB",
+        "summary": "Retention Summary",
+        "total": "Total reports",
+        "cutoff": "Cutoff (UTC)",
+        "old": "Reports older than threshold (Generation)",
+        "keep_recent": "Reports kept (recent)",
+        "keep_monthly": "Reports kept (monthly for old)",
+        "extras": "Reports to remove (extras)",
+
+        "per_domain": "Top domains with most removals",
+        "domain": "Domain",
+        "remove_count": "To remove",
+        "kept_old_monthly": "Kept monthly (old)",
+
+        "export_plan": "Exporting plan (CSV)",
+        "plan_folder": "Plan folder",
+        "plan_exported": "Plan exported",
+
+        "preview_delete": "Preview: first rows to remove",
+        "no_extras": "Nothing to remove. Exiting.",
+        "safe_default_archive": "Default archive directory",
+        "action_old": "For reports older than threshold: action [archive/delete]",
+        "archive_dir": "Archive directory",
+        "archive_fmt": "Archive format [jsonl/csv]",
+        "zip_q": "Create ZIP archive?",
+        "dryrun_prep": "Dry-run: preparing delete set (no data changed)",
+        "dryrun_table": "Dry-run: impacted rows per table",
+        "dryrun_ready": "Dry-run ready. Reports to remove",
+        "apply": "Apply changes now? (Dry-run is default)",
+        "final_confirm": "Final confirmation: this will DELETE data. Continue?",
+
+        "archiving": "Archiving selected reports",
+        "archive_created": "Archive created",
+        "zip_created": "Archive ZIP created",
+
+        "deleting": "Deleting dependent tables and reports",
+        "done": "Done.",
+        "dryrun_only": "Dry-run only. No changes applied.",
+        "cancelled": "Cancelled. No deletion applied.",
+        "logfile": "Log file",
+        "err": "ERROR",
+        "connected_to": "Connected to",
+        "index_check": "Checking retention index",
+        "index_missing": "No covering index on Reports(Generation, ID) — the plan query may scan the full table",
+        "index_create_q": "Create index IX_Reports_Gen_ID now?",
+        "index_created": "Index created",
+        "index_fail": "Index creation failed (continuing without it)",
+    },
+
+    "FR": {
+        "title": "Maintenance Base de Données PingCastle",
+        "subtitle": "Nettoyage Rétention Mensuelle (Génération / Dernier rapport)",
+        "tagline": "Tout garder en récent • 1/mois/domaine pour l’ancien • Archivage/Suppression optionnels",
+        "author": "AUTHOR = Karim AZZOUZI",
+        "vendor": "VENDOR = Netwrix Corporation",
+
+        "language": "Langue",
+        "invalid": "Entrée invalide, merci de réessayer.",
+        "press_enter": "Appuyez sur Entrée pour continuer",
+
+        "step": "Étape",
+        "sql_conn": "Connexion SQL Server",
+        "odbc_driver": "Drivers ODBC installés (SQL Server)",
+        "select_driver": "Choisir le driver #",
+
+        "host": "Hôte SQL Server",
+        "instance": "Nom d’instance (vide = instance par défaut)",
+        "port": "Port TCP",
+        "db": "Nom de la base",
+        "auth": "Authentification [windows/sql]",
+        "user": "Utilisateur SQL",
+        "pwd": "Mot de passe SQL",
+        "encrypt": "Chiffrer la connexion ?",
+        "trust": "Faire confiance au certificat serveur ?",
+        "testing": "Test de connexion...",
+        "test_ok": "Connexion OK.",
+        "test_fail": "Échec de connexion.",
+        "retry": "Recommencer la saisie de connexion ?",
+
+        "detect_reports": "Détection de la table Reports PingCastle",
+        "detect_children": "Détection des tables dépendantes (FK vers Reports)",
+        "reports_found": "Table Reports détectée",
+        "children_found": "Tables dépendantes détectées",
+        "using_domain_name": "Colonne de nom de domaine détectée",
+
+        "retention": "Paramètres de rétention",
+        "choose_retention": "Choisissez le seuil de conservation",
+        "ret_1y": "1) 1 an (365 jours)",
+        "ret_6m": "2) 6 mois (183 jours)",
+        "ret_custom": "3) Jours personnalisés",
+        "ret_prompt": "Sélection [1/2/3]",
+        "custom_days": "Entrez le nombre de jours de conservation",
+
+        "logic_title": "Règle client",
+        "logic_body": (
+            "Date de référence = Génération (aka 'Dernier rapport').\n"
+            "• Rapports plus récents que le seuil : TOUT CONSERVER\n"
+            "• Rapports plus anciens que le seuil : ne conserver que le plus récent du mois par domaine\n"
+            "  et supprimer les rapports hebdomadaires en trop."
+        ),
+
+        "plan": "Construction du plan de rétention",
+        "loading_reports": "Chargement des rapports depuis la DB",
+        "summary": "Résumé de Rétention",
+        "total": "Total des rapports",
+        "cutoff": "Seuil (UTC)",
+        "old": "Rapports plus anciens que le seuil (Génération)",
+        "keep_recent": "Rapports conservés (récents)",
+        "keep_monthly": "Rapports conservés (mensuels pour anciens)",
+        "extras": "Rapports à supprimer (extras)",
+
+        "per_domain": "Top domaines avec le plus de suppressions",
+        "domain": "Domaine",
+        "remove_count": "À supprimer",
+        "kept_old_monthly": "Mensuels conservés (anciens)",
+
+        "export_plan": "Export du plan (CSV)",
+        "plan_folder": "Dossier du plan",
+        "plan_exported": "Plan exporté",
+
+        "preview_delete": "Aperçu : premières lignes à supprimer",
+        "no_extras": "Rien à supprimer. Fin.",
+        "safe_default_archive": "Dossier d’archive par défaut",
+        "action_old": "Pour les rapports plus anciens que le seuil : action [archive/delete]",
+        "archive_dir": "Dossier d’archivage",
+        "archive_fmt": "Format d’archive [jsonl/csv]",
+        "zip_q": "Créer une archive ZIP ?",
+        "dryrun_prep": "Dry-run : préparation de la suppression (aucune donnée modifiée)",
+        "dryrun_table": "Dry-run : lignes impactées par table",
+        "dryrun_ready": "Dry-run prêt. Rapports à supprimer",
+        "apply": "Appliquer maintenant ? (Dry-run par défaut)",
+        "final_confirm": "Confirmation finale : cela SUPPRIME des données. Continuer ?",
+
+        "archiving": "Archivage des rapports sélectionnés",
+        "archive_created": "Archive créée",
+        "zip_created": "Archive ZIP créée",
+
+        "deleting": "Suppression des tables dépendantes et des rapports",
+        "done": "Terminé.",
+        "dryrun_only": "Dry-run uniquement. Aucun changement appliqué.",
+        "cancelled": "Annulé. Aucune suppression appliquée.",
+        "logfile": "Fichier log",
+        "err": "ERREUR",
+        "connected_to": "Connecté à",
+        "index_check": "Vérification de l'index de rétention",
+        "index_missing": "Aucun index couvrant sur Reports(Generation, ID) — la requête de plan peut parcourir toute la table",
+        "index_create_q": "Créer l'index IX_Reports_Gen_ID maintenant ?",
+        "index_created": "Index créé",
+        "index_fail": "Échec de la création de l'index (poursuite sans)",
+    },
+
+    "IT": {
+        "title": "Manutenzione Database PingCastle",
+        "subtitle": "Pulizia Retention Mensile (Generazione / Ultimo report)",
+        "tagline": "Conserva il recente • 1/mese/dominio per il vecchio • Archiviazione/Eliminazione opzionali",
+        "author": "AUTHOR = Karim AZZOUZI",
+        "vendor": "VENDOR = Netwrix Corporation",
+
+        "language": "Lingua",
+        "invalid": "Input non valido, riprova.",
+        "press_enter": "Premi Invio per continuare",
+
+        "step": "Passo",
+        "sql_conn": "Connessione SQL Server",
+        "odbc_driver": "Driver ODBC installati (SQL Server)",
+        "select_driver": "Seleziona driver #",
+
+        "host": "Host SQL Server",
+        "instance": "Nome istanza (vuoto = predefinita)",
+        "port": "Porta TCP",
+        "db": "Nome database",
+        "auth": "Autenticazione [windows/sql]",
+        "user": "Username SQL",
+        "pwd": "Password SQL",
+        "encrypt": "Crittografare la connessione?",
+        "trust": "Considerare attendibile il certificato del server?",
+        "testing": "Test connessione...",
+        "test_ok": "Connessione OK.",
+        "test_fail": "Connessione fallita.",
+        "retry": "Riprovare impostazioni di connessione?",
+
+        "detect_reports": "Rilevamento tabella Reports PingCastle",
+        "detect_children": "Rilevamento tabelle dipendenti (FK verso Reports)",
+        "reports_found": "Tabella Reports trovata",
+        "children_found": "Tabelle dipendenti trovate",
+        "using_domain_name": "Colonna nome dominio rilevata",
+
+        "retention": "Impostazioni retention",
+        "choose_retention": "Scegli la soglia di retention",
+        "ret_1y": "1) 1 anno (365 giorni)",
+        "ret_6m": "2) 6 mesi (183 giorni)",
+        "ret_custom": "3) Giorni personalizzati",
+        "ret_prompt": "Selezione [1/2/3]",
+        "custom_days": "Inserisci i giorni di retention",
+
+        "logic_title": "Regola cliente",
+        "logic_body": (
+            "Data di riferimento = Generazione (aka 'Ultimo report').\n"
+            "• Report più recenti della soglia: MANTIENI TUTTO\n"
+            "• Report più vecchi della soglia: mantieni SOLO l'ultimo report del mese per dominio\n"
+            "  ed elimina gli extra settimanali."
+        ),
+
+        "plan": "Creazione piano di retention",
+        "loading_reports": "Caricamento report dal DB",
+        "summary": "Riepilogo Retention",
+        "total": "Report totali",
+        "cutoff": "Soglia (UTC)",
+        "old": "Report più vecchi della soglia (Generazione)",
+        "keep_recent": "Report mantenuti (recenti)",
+        "keep_monthly": "Report mantenuti (mensili per vecchi)",
+        "extras": "Report da rimuovere (extra)",
+
+        "per_domain": "Top domini con più rimozioni",
+        "domain": "Dominio",
+        "remove_count": "Da rimuovere",
+        "kept_old_monthly": "Mensili mantenuti (vecchi)",
+
+        "export_plan": "Esportazione piano (CSV)",
+        "plan_folder": "Cartella piano",
+        "plan_exported": "Piano esportato",
+
+        "preview_delete": "Anteprima: prime righe da rimuovere",
+        "no_extras": "Niente da rimuovere. Uscita.",
+        "safe_default_archive": "Directory archivio predefinita",
+        "action_old": "Per i report più vecchi della soglia: azione [archive/delete]",
+        "archive_dir": "Directory archivio",
+        "archive_fmt": "Formato archivio [jsonl/csv]",
+        "zip_q": "Creare archivio ZIP?",
+        "dryrun_prep": "Dry-run: preparazione set di eliminazione (nessuna modifica)",
+        "dryrun_table": "Dry-run: righe impattate per tabella",
+        "dryrun_ready": "Dry-run pronto. Report da rimuovere",
+        "apply": "Applicare ora? (Dry-run è predefinito)",
+        "final_confirm": "Conferma finale: questo ELIMINERÀ dati. Continuare?",
+
+        "archiving": "Archiviazione report selezionati",
+        "archive_created": "Archivio creato",
+        "zip_created": "ZIP archivio creato",
+
+        "deleting": "Eliminazione tabelle dipendenti e report",
+        "done": "Fatto.",
+        "dryrun_only": "Solo dry-run. Nessuna modifica applicata.",
+        "cancelled": "Annullato. Nessuna eliminazione applicata.",
+        "logfile": "File log",
+        "err": "ERRORE",
+        "connected_to": "Connesso a",
+        "index_check": "Verifica dell'indice di retention",
+        "index_missing": "Nessun indice di copertura su Reports(Generation, ID) — la query del piano può scansionare l'intera tabella",
+        "index_create_q": "Creare ora l'indice IX_Reports_Gen_ID?",
+        "index_created": "Indice creato",
+        "index_fail": "Creazione dell'indice non riuscita (si continua senza)",
+    },
+
+    "DE": {
+        "title": "PingCastle Datenbankwartung",
+        "subtitle": "Monatliche Retention-Bereinigung (Generation / Letzter Report)",
+        "tagline": "Aktuelles behalten • Für alte Reports 1/Monat/Domäne • Optional archivieren/löschen",
+        "author": "AUTHOR = Karim AZZOUZI",
+        "vendor": "VENDOR = Netwrix Corporation",
+
+        "language": "Sprache",
+        "invalid": "Ungültige Eingabe, bitte erneut versuchen.",
+        "press_enter": "Drücken Sie Enter, um fortzufahren",
+
+        "step": "Schritt",
+        "sql_conn": "SQL Server Verbindung",
+        "odbc_driver": "Installierte ODBC-Treiber (SQL Server)",
+        "select_driver": "Treiber auswählen #",
+
+        "host": "SQL Server Host",
+        "instance": "Instanzname (leer = Standard)",
+        "port": "TCP-Port",
+        "db": "Datenbankname",
+        "auth": "Authentifizierung [windows/sql]",
+        "user": "SQL Benutzername",
+        "pwd": "SQL Passwort",
+        "encrypt": "Verbindung verschlüsseln?",
+        "trust": "Serverzertifikat vertrauen?",
+        "testing": "Verbindung wird getestet...",
+        "test_ok": "Verbindung OK.",
+        "test_fail": "Verbindung fehlgeschlagen.",
+        "retry": "Verbindungseinstellungen erneut eingeben?",
+
+        "detect_reports": "Erkennung der PingCastle Reports-Tabelle",
+        "detect_children": "Erkennung abhängiger Tabellen (FK zu Reports)",
+        "reports_found": "Reports-Tabelle gefunden",
+        "children_found": "Abhängige Tabellen gefunden",
+        "using_domain_name": "Spalte für Domänennamen erkannt",
+
+        "retention": "Retention-Einstellungen",
+        "choose_retention": "Retention-Schwelle wählen",
+        "ret_1y": "1) 1 Jahr (365 Tage)",
+        "ret_6m": "2) 6 Monate (183 Tage)",
+        "ret_custom": "3) Benutzerdefinierte Tage",
+        "ret_prompt": "Auswahl [1/2/3]",
+        "custom_days": "Retention-Tage eingeben",
+
+        "logic_title": "Kundenregel",
+        "logic_body": (
+            "Referenzdatum = Generation (aka 'Letzter Report').\n"
+            "• Reports neuer als die Schwelle: ALLE BEHALTEN\n"
+            "• Reports älter als die Schwelle: pro Monat und Domäne nur den neuesten Report behalten\n"
+            "  und die übrigen (wöchentlichen) löschen."
+        ),
+
+        "plan": "Retention-Plan wird erstellt",
+        "loading_reports": "Reports aus der DB werden geladen",
+        "summary": "Retention-Zusammenfassung",
+        "total": "Reports gesamt",
+        "cutoff": "Schwelle (UTC)",
+        "old": "Reports älter als die Schwelle (Generation)",
+        "keep_recent": "Behalten (neu)",
+        "keep_monthly": "Behalten (monatlich für alt)",
+        "extras": "Zu entfernen (Extras)",
+
+        "per_domain": "Top-Domänen mit den meisten Löschungen",
+        "domain": "Domäne",
+        "remove_count": "Zu entfernen",
+        "kept_old_monthly": "Monatlich behalten (alt)",
+
+        "export_plan": "Plan wird exportiert (CSV)",
+        "plan_folder": "Plan-Ordner",
+        "plan_exported": "Plan exportiert",
+
+        "preview_delete": "Vorschau: erste Zeilen zum Entfernen",
+        "no_extras": "Nichts zu entfernen. Beenden.",
+        "safe_default_archive": "Standard-Archivverzeichnis",
+        "action_old": "Für Reports älter als die Schwelle: Aktion [archive/delete]",
+        "archive_dir": "Archivverzeichnis",
+        "archive_fmt": "Archivformat [jsonl/csv]",
+        "zip_q": "ZIP-Archiv erstellen?",
+        "dryrun_prep": "Dry-run: Delete-Set wird vorbereitet (keine Änderungen)",
+        "dryrun_table": "Dry-run: betroffene Zeilen pro Tabelle",
+        "dryrun_ready": "Dry-run bereit. Reports zum Entfernen",
+        "apply": "Jetzt anwenden? (Dry-run ist Standard)",
+        "final_confirm": "Letzte Bestätigung: Daten werden GELÖSCHT. Fortfahren?",
+
+        "archiving": "Ausgewählte Reports werden archiviert",
+        "archive_created": "Archiv erstellt",
+        "zip_created": "ZIP-Archiv erstellt",
+
+        "deleting": "Abhängige Tabellen und Reports werden gelöscht",
+        "done": "Fertig.",
+        "dryrun_only": "Nur Dry-run. Keine Änderungen angewendet.",
+        "cancelled": "Abgebrochen. Keine Löschung durchgeführt.",
+        "logfile": "Logdatei",
+        "err": "FEHLER",
+        "connected_to": "Verbunden mit",
+        "index_check": "Prüfe Aufbewahrungs-Index",
+        "index_missing": "Kein abdeckender Index auf Reports(Generation, ID) — die Planabfrage kann die gesamte Tabelle scannen",
+        "index_create_q": "Index IX_Reports_Gen_ID jetzt erstellen?",
+        "index_created": "Index erstellt",
+        "index_fail": "Indexerstellung fehlgeschlagen (weiter ohne Index)",
+    },
+
+    "ES": {
+        "title": "Mantenimiento de Base de Datos PingCastle",
+        "subtitle": "Limpieza de Retención Mensual (Generación / Último informe)",
+        "tagline": "Conservar lo reciente • 1/mes/dominio para lo antiguo • Archivar/Eliminar opcional",
+        "author": "AUTHOR = Karim AZZOUZI",
+        "vendor": "VENDOR = Netwrix Corporation",
+
+        "language": "Idioma",
+        "invalid": "Entrada no válida, inténtalo de nuevo.",
+        "press_enter": "Pulsa Enter para continuar",
+
+        "step": "Paso",
+        "sql_conn": "Conexión SQL Server",
+        "odbc_driver": "Drivers ODBC instalados (SQL Server)",
+        "select_driver": "Selecciona driver #",
+
+        "host": "Host SQL Server",
+        "instance": "Nombre de instancia (vacío = por defecto)",
+        "port": "Puerto TCP",
+        "db": "Nombre de la base",
+        "auth": "Autenticación [windows/sql]",
+        "user": "Usuario SQL",
+        "pwd": "Contraseña SQL",
+        "encrypt": "¿Cifrar la conexión?",
+        "trust": "¿Confiar en el certificado del servidor?",
+        "testing": "Probando conexión...",
+        "test_ok": "Conexión OK.",
+        "test_fail": "Conexión fallida.",
+        "retry": "¿Reintentar configuración de conexión?",
+
+        "detect_reports": "Detectando tabla Reports de PingCastle",
+        "detect_children": "Detectando tablas dependientes (FK a Reports)",
+        "reports_found": "Tabla Reports encontrada",
+        "children_found": "Tablas dependientes encontradas",
+        "using_domain_name": "Columna de nombre de dominio detectada",
+
+        "retention": "Configuración de retención",
+        "choose_retention": "Elige el umbral de retención",
+        "ret_1y": "1) 1 año (365 días)",
+        "ret_6m": "2) 6 meses (183 días)",
+        "ret_custom": "3) Días personalizados",
+        "ret_prompt": "Selección [1/2/3]",
+        "custom_days": "Introduce los días de retención",
+
+        "logic_title": "Regla del cliente",
+        "logic_body": (
+            "Fecha de referencia = Generación (aka 'Último informe').\n"
+            "• Informes más recientes que el umbral: CONSERVAR TODO\n"
+            "• Informes más antiguos que el umbral: conservar SOLO el informe más reciente del mes por dominio\n"
+            "  y eliminar los informes semanales extra."
+        ),
+
+        "plan": "Construyendo plan de retención",
+        "loading_reports": "Cargando informes desde la BD",
+        "summary": "Resumen de Retención",
+        "total": "Total de informes",
+        "cutoff": "Umbral (UTC)",
+        "old": "Informes más antiguos que el umbral (Generación)",
+        "keep_recent": "Informes conservados (recientes)",
+        "keep_monthly": "Informes conservados (mensuales para antiguos)",
+        "extras": "Informes a eliminar (extras)",
+
+        "per_domain": "Dominios con más eliminaciones",
+        "domain": "Dominio",
+        "remove_count": "A eliminar",
+        "kept_old_monthly": "Mensuales conservados (antiguos)",
+
+        "export_plan": "Exportando plan (CSV)",
+        "plan_folder": "Carpeta del plan",
+        "plan_exported": "Plan exportado",
+
+        "preview_delete": "Vista previa: primeras filas a eliminar",
+        "no_extras": "Nada que eliminar. Saliendo.",
+        "safe_default_archive": "Directorio de archivo por defecto",
+        "action_old": "Para informes más antiguos que el umbral: acción [archive/delete]",
+        "archive_dir": "Directorio de archivo",
+        "archive_fmt": "Formato de archivo [jsonl/csv]",
+        "zip_q": "¿Crear archivo ZIP?",
+        "dryrun_prep": "Dry-run: preparando conjunto de eliminación (sin cambios)",
+        "dryrun_table": "Dry-run: filas impactadas por tabla",
+        "dryrun_ready": "Dry-run listo. Informes a eliminar",
+        "apply": "¿Aplicar ahora? (Dry-run por defecto)",
+        "final_confirm": "Confirmación final: esto BORRARÁ datos. ¿Continuar?",
+
+        "archiving": "Archivando informes seleccionados",
+        "archive_created": "Archivo creado",
+        "zip_created": "ZIP creado",
+
+        "deleting": "Eliminando tablas dependientes e informes",
+        "done": "Hecho.",
+        "dryrun_only": "Solo dry-run. No se aplicaron cambios.",
+        "cancelled": "Cancelado. No se aplicó ninguna eliminación.",
+        "logfile": "Archivo log",
+        "err": "ERROR",
+        "connected_to": "Conectado a",
+        "index_check": "Comprobando el índice de retención",
+        "index_missing": "No hay índice de cobertura en Reports(Generation, ID) — la consulta del plan puede recorrer toda la tabla",
+        "index_create_q": "¿Crear ahora el índice IX_Reports_Gen_ID?",
+        "index_created": "Índice creado",
+        "index_fail": "Error al crear el índice (se continúa sin él)",
+    },
+}
+
+
+# The authoring format stays a dict of dicts per language, but lookups go
+# through a flat 2D tuple indexed by (language index, key index): one C-level
+# tuple index per tr() call instead of two dict lookups with .get fallbacks.
+_KEYS: Tuple[str, ...] = tuple(T["EN"])
+
+
+class K:
+    """Integer IDs for the message keys in ``T`` (order of ``_KEYS``)."""
+
+    TITLE = 0
+    SUBTITLE = 1
+    TAGLINE = 2
+    AUTHOR = 3
+    VENDOR = 4
+    LANGUAGE = 5
+    INVALID = 6
+    PRESS_ENTER = 7
+    STEP = 8
+    SQL_CONN = 9
+    ODBC_DRIVER = 10
+    SELECT_DRIVER = 11
+    HOST = 12
+    INSTANCE = 13
+    PORT = 14
+    DB = 15
+    AUTH = 16
+    USER = 17
+    PWD = 18
+    ENCRYPT = 19
+    TRUST = 20
+    TESTING = 21
+    TEST_OK = 22
+    TEST_FAIL = 23
+    RETRY = 24
+    DETECT_REPORTS = 25
+    DETECT_CHILDREN = 26
+    REPORTS_FOUND = 27
+    CHILDREN_FOUND = 28
+    USING_DOMAIN_NAME = 29
+    RETENTION = 30
+    CHOOSE_RETENTION = 31
+    RET_1Y = 32
+    RET_6M = 33
+    RET_CUSTOM = 34
+    RET_PROMPT = 35
+    CUSTOM_DAYS = 36
+    LOGIC_TITLE = 37
+    LOGIC_BODY = 38
+    PLAN = 39
+    LOADING_REPORTS = 40
+    SUMMARY = 41
+    TOTAL = 42
+    CUTOFF = 43
+    OLD = 44
+    KEEP_RECENT = 45
+    KEEP_MONTHLY = 46
+    EXTRAS = 47
+    PER_DOMAIN = 48
+    DOMAIN = 49
+    REMOVE_COUNT = 50
+    KEPT_OLD_MONTHLY = 51
+    EXPORT_PLAN = 52
+    PLAN_FOLDER = 53
+    PLAN_EXPORTED = 54
+    PREVIEW_DELETE = 55
+    NO_EXTRAS = 56
+    SAFE_DEFAULT_ARCHIVE = 57
+    ACTION_OLD = 58
+    ARCHIVE_DIR = 59
+    ARCHIVE_FMT = 60
+    ZIP_Q = 61
+    DRYRUN_PREP = 62
+    DRYRUN_TABLE = 63
+    DRYRUN_READY = 64
+    APPLY = 65
+    FINAL_CONFIRM = 66
+    ARCHIVING = 67
+    ARCHIVE_CREATED = 68
+    ZIP_CREATED = 69
+    DELETING = 70
+    DONE = 71
+    DRYRUN_ONLY = 72
+    CANCELLED = 73
+    LOGFILE = 74
+    ERR = 75
+    CONNECTED_TO = 76
+    INDEX_CHECK = 77
+    INDEX_MISSING = 78
+    INDEX_CREATE_Q = 79
+    INDEX_CREATED = 80
+    INDEX_FAIL = 81
+
+
+_LANG_IDX: Dict[str, int] = {lang: i for i, lang in enumerate(LANGS)}
+_TRANS: Tuple[Tuple[str, ...], ...] = tuple(tuple(T[lang][k] for k in _KEYS) for lang in LANGS)
+
+
+def tr(lang: str, key: int) -> str:
+    return _TRANS[_LANG_IDX.get(lang, 0)][key]
+
+
+# -------------------------
+# Logging
+# -------------------------
+def now_stamp(now: Optional[dt.datetime] = None) -> str:
+    # f-string formatting avoids strftime's locale machinery; passing an
+    # explicit "now" lets one run share a single timestamp across its
+    # log/plan/archive names.
+    n = now if now is not None else dt.datetime.now(dt.timezone.utc)
+    return f"{n.year:04d}{n.month:02d}{n.day:02d}-{n.hour:02d}{n.minute:02d}{n.second:02d}"
+
+
+def log_path_default(now: Optional[dt.datetime] = None) -> str:
+    return f"PingCastleMaintenance-{now_stamp(now)}.log"
+
+
+# One buffered append handle per logfile, opened lazily on first write and
+# closed at interpreter exit — instead of an open/close syscall pair per
+# message.
+_LOG_HANDLES: Dict[str, "io.TextIOWrapper"] = {}
+
+
+def _close_log_handles() -> None:
+    for f in _LOG_HANDLES.values():
+        try:
+            f.close()
+        except Exception:
+            pass
+    _LOG_HANDLES.clear()
+
+
+atexit.register(_close_log_handles)
+
+
+def log_write(logfile: str, msg: str) -> None:
+    f = _LOG_HANDLES.get(logfile)
+    if f is None:
+        f = open(logfile, "a", encoding="utf-8", buffering=1 << 16)
+        _LOG_HANDLES[logfile] = f
+    f.write(msg.rstrip() + "\n")
+
+
+def ok(msg: str) -> None:
+    console.print(f"[bold green]✔[/bold green] {msg}")
+
+
+def warn(msg: str) -> None:
+    console.print(f"[bold yellow]⚠[/bold yellow] {msg}")
+
+
+def info(msg: str) -> None:
+    console.print(f"[bold cyan]▶[/bold cyan] {msg}")
+
+
+def err(msg: str) -> None:
+    console.print(f"[bold red]✖[/bold red] {msg}")
+
+
+# -------------------------
+# SQL structures
+# -------------------------
+# slots=True drops the per-instance __dict__ (FKRef can exist per child
+# table); frozen=True because detection results are never mutated. The quoted
+# fully-qualified name is computed once at construction instead of on every
+# SQL-format call.
+@dataclass(slots=True, frozen=True)
+class ReportsTable:
+    schema: str
+    table: str
+    fq: str = ""
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "fq", f"{q(self.schema)}.{q(self.table)}")
+
+
+@dataclass(slots=True, frozen=True)
+class FKRef:
+    child_schema: str
+    child_table: str
+    child_column: str
+    child_fq: str = ""
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "child_fq", f"{q(self.child_schema)}.{q(self.child_table)}")
+
+
+_Q_TABLE = str.maketrans({"]": "]]"})
+
+
+def q(identifier: str) -> str:
+    return "[" + identifier.translate(_Q_TABLE) + "]"
+
+
+# -------------------------
+# Connection builder
+# -------------------------
+@functools.lru_cache(maxsize=1)
+def list_odbc_sqlserver_drivers() -> Tuple[str, ...]:
+    # pyodbc.drivers() walks the registry on Windows; the result cannot change
+    # mid-session, so enumerate once and cache. Preference order is expressed
+    # as a sort key instead of separate preferred/others lists.
+    def key(d: str) -> Tuple[int, str]:
+        return (0 if "ODBC Driver 18" in d else 1 if "ODBC Driver 17" in d else 2, d)
+
+    candidates = [d for d in pyodbc.drivers() if "SQL Server" in d or "ODBC Driver" in d or "Native Client" in d]
+    return tuple(sorted(candidates, key=key))
+
+
+def choose_driver(lang: str) -> str:
+    drivers = list_odbc_sqlserver_drivers()
+    if not drivers:
+        raise RuntimeError("No SQL Server ODBC driver found.")
+
+    table = Table(title=tr(lang, K.ODBC_DRIVER), show_lines=True)
+    table.add_column("#", justify="right", style="bold")
+    table.add_column("Driver name", overflow="fold")
+    for i, d in enumerate(drivers, 1):
+        table.add_row(str(i), d)
+    console.print(table)
+
+    default_idx = 1
+    for i, d in enumerate(drivers, 1):
+        if "ODBC Driver 18 for SQL Server" in d:
+            default_idx = i
+            break
+        if "ODBC Driver 17 for SQL Server" in d:
+            default_idx = i
+
+    while True:
+        s = Prompt.ask(tr(lang, K.SELECT_DRIVER), default=str(default_idx)).strip()
+        if s.isdigit() and 1 <= int(s) <= len(drivers):
+            return drivers[int(s) - 1]
+        warn(tr(lang, K.INVALID))
+
+
+def build_server(host: str, instance: str, port: int) -> str:
+    host = host.strip()
+    instance = instance.strip()
+    if instance:
+        if port and port != 1433:
+            return f"{host}\\{instance},{port}"
+        return f"{host}\\{instance}"
+    if port:
+        return f"tcp:{host},{port}"
+    return f"tcp:{host},1433"
+
+
+def connect_sqlserver_interactive(lang: str, logfile: str) -> Tuple[pyodbc.Connection, str]:
+    driver = choose_driver(lang)
+
+    host = Prompt.ask(tr(lang, K.HOST), default=os.environ.get("COMPUTERNAME", "localhost"))
+    instance = Prompt.ask(tr(lang, K.INSTANCE), default="").strip()
+    port_s = Prompt.ask(tr(lang, K.PORT), default="1433")
+    try:
+        port = int(port_s.strip())
+    except Exception:
+        port = 1433
+
+    db = Prompt.ask(tr(lang, K.DB), default="PingCastleEnterprise")
+    auth = Prompt.ask(tr(lang, K.AUTH), default="windows").strip().lower()
+    if auth not in ("windows", "sql"):
+        auth = "windows"
+
+    encrypt = Confirm.ask(tr(lang, K.ENCRYPT), default=True)
+    trust = Confirm.ask(tr(lang, K.TRUST), default=True)
+
+    uid = ""
+    pwd = ""
+    if auth == "sql":
+        import getpass
+
+        uid = Prompt.ask(tr(lang, K.USER), default="")
+        pwd = getpass.getpass(tr(lang, K.PWD) + ": ")
+
+    server = build_server(host, instance, port)
+
+    parts = [
+        f"DRIVER={{{driver}}}",
+        f"SERVER={server}",
+        f"DATABASE={db}",
+        "Connection Timeout=30",
+        "Application Name=PingCastleMaintenance",
+        # Largest TDS packet the driver allows: fewer round trips when the
+        # archive step streams multi-MB RawData blobs.
+        "Packet Size=32767",
+    ]
+    parts.append("Encrypt=yes" if encrypt else "Encrypt=no")
+    parts.append(f"TrustServerCertificate={'yes' if trust else 'no'}")
+
+    if auth == "windows":
+        parts.append("Trusted_Connection=yes")
+    else:
+        parts.append(f"UID={uid}")
+        parts.append(f"PWD={pwd}")
+
+    conn_str = ";".join(parts) + ";"
+
+    info(tr(lang, K.TESTING))
+    conn = pyodbc.connect(conn_str, autocommit=False)
+    ok(tr(lang, K.TEST_OK))
+    ok(f"{tr(lang, K.CONNECTED_TO)} {server}  |  DB={db}")
+    log_write(logfile, f"[conn] OK server={server} db={db} auth={auth} driver={driver}")
+    return conn, conn_str
+
+
+# -------------------------
+# Schema detection
+# -------------------------
+# Detection results are stable for a given database, so memoize them per
+# (server, db) to avoid re-scanning sys.tables / sys.foreign_keys when the
+# user retries connection settings or re-runs within a session.
+_NEEDED_REPORTS_COLS = frozenset({"ID", "DomainID", "ImportedDate", "RawData", "Generation"})
+
+_SCHEMA_CACHE: Dict[Tuple[str, str], ReportsTable] = {}
+_FK_CACHE: Dict[Tuple[str, str], List[FKRef]] = {}
+
+
+def _connection_key(cur) -> Tuple[str, str]:
+    cur.execute("SELECT @@SERVERNAME, DB_NAME();")
+    r = cur.fetchone()
+    return str(r[0]), str(r[1])
+
+
+def detect_reports_table(cur) -> ReportsTable:
+    key = _connection_key(cur)
+    cached = _SCHEMA_CACHE.get(key)
+    if cached is not None:
+        return cached
+    # One round trip: candidate tables and their columns together, grouped in
+    # Python — instead of a sys.columns query per candidate schema.
+    cur.execute(
+        """
+        SELECT s.name AS schema_name, t.name AS table_name, c.name AS column_name
+        FROM sys.tables t
+        JOIN sys.schemas s ON t.schema_id = s.schema_id
+        JOIN sys.columns c ON c.object_id = t.object_id
+        WHERE t.name = 'Reports'
+        """
+    )
+    by_tbl: Dict[Tuple[str, str], set] = {}
+    for schema, table, col in cur.fetchall():
+        by_tbl.setdefault((schema, table), set()).add(col)
+    if not by_tbl:
+        raise RuntimeError("Reports table not found.")
+
+    best: Optional[ReportsTable] = None
+    best_score = -1
+
+    for (schema, table), cols in by_tbl.items():
+        score = 5 * len(cols & _NEEDED_REPORTS_COLS)
+        if score > best_score:
+            best_score = score
+            best = ReportsTable(schema=schema, table=table)
+
+    if not best:
+        raise RuntimeError("Unable to select Reports table.")
+    _SCHEMA_CACHE[key] = best
+    return best
+
+
+def detect_domains_table(cur) -> Tuple[str, str]:
+    cur.execute(
+        """
+        SELECT s.name AS schema_name, t.name AS table_name
+        FROM sys.tables t
+        JOIN sys.schemas s ON t.schema_id = s.schema_id
+        WHERE t.name = 'Domains'
+        """
+    )
+    r = cur.fetchone()
+    if not r:
+        raise RuntimeError("Domains table not found.")
+    return r[0], r[1]
+
+
+def detect_report_name_source(cur) -> Tuple[str, str, str]:
+    dom_schema, dom_table = detect_domains_table(cur)
+
+    for candidate in ("Name", "NetBiosName"):
+        cur.execute(
+            """
+            SELECT 1
+            FROM sys.columns c
+            JOIN sys.tables t ON c.object_id = t.object_id
+            JOIN sys.schemas s ON t.schema_id = s.schema_id
+            WHERE s.name = ? AND t.name = ? AND c.name = ?
+            """,
+            dom_schema, dom_table, candidate,
+        )
+        if cur.fetchone():
+            return dom_schema, dom_table, candidate
+
+    return dom_schema, dom_table, "ID"
+
+
+def detect_dependent_tables(cur, reports: ReportsTable) -> List[FKRef]:
+    key = _connection_key(cur)
+    cached = _FK_CACHE.get(key)
+    if cached is not None:
+        return cached
+    cur.execute(
+        """
+        ;WITH fk AS (
+            SELECT
+                sch_child.name AS child_schema,
+                t_child.name AS child_table,
+                c_child.name AS child_column,
+                sch_parent.name AS parent_schema,
+                t_parent.name AS parent_table
+            FROM sys.foreign_keys fk
+            JOIN sys.foreign_key_columns fkc ON fk.object_id = fkc.constraint_object_id
+            JOIN sys.tables t_child ON fkc.parent_object_id = t_child.object_id
+            JOIN sys.schemas sch_child ON t_child.schema_id = sch_child.schema_id
+            JOIN sys.columns c_child ON c_child.object_id = t_child.object_id AND c_child.column_id = fkc.parent_column_id
+            JOIN sys.tables t_parent ON fkc.referenced_object_id = t_parent.object_id
+            JOIN sys.schemas sch_parent ON t_parent.schema_id = sch_parent.schema_id
+        )
+        SELECT child_schema, child_table, child_column
+        FROM fk
+        WHERE parent_schema = ? AND parent_table = ?
+        ORDER BY child_schema, child_table, child_column
+        """,
+        reports.schema, reports.table,
+    )
+    refs = [FKRef(child_schema=r[0], child_table=r[1], child_column=r[2]) for r in cur.fetchall()]
+    _FK_CACHE[key] = refs
+    return refs
+
+
+# On top of the in-memory caches, detection results persist across runs in a
+# JSON sidecar keyed by server+database, invalidated by the newest
+# modify_date of any table or FK — so a stable schema costs one version probe
+# instead of four catalog queries per start.
+def _schema_cache_path() -> str:
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "PingCastleMaintenance", "schema.json")
+
+
+def _schema_version(cur) -> str:
+    cur.execute("SELECT CAST(MAX(modify_date) AS varchar(40)) FROM sys.objects WHERE type IN ('U','F');")
+    r = cur.fetchone()
+    return str(r[0]) if r and r[0] is not None else ""
+
+
+def load_schema_cache(cur) -> Optional[Tuple[ReportsTable, str, str, str, List[FKRef]]]:
+    import json
+
+    try:
+        with open(_schema_cache_path(), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    server, db = _connection_key(cur)
+    entry = data.get(f"{server}|{db}")
+    if not entry or entry.get("version") != _schema_version(cur):
+        return None
+    try:
+        reports = ReportsTable(schema=entry["reports"]["schema"], table=entry["reports"]["table"])
+        deps = [
+            FKRef(child_schema=d["schema"], child_table=d["table"], child_column=d["column"])
+            for d in entry["deps"]
+        ]
+        return reports, entry["dom_schema"], entry["dom_table"], entry["dom_name_col"], deps
+    except (KeyError, TypeError):
+        return None
+
+
+def save_schema_cache(
+    cur,
+    reports: ReportsTable,
+    dom_schema: str,
+    dom_table: str,
+    dom_name_col: str,
+    deps: List[FKRef],
+) -> None:
+    import json
+
+    path = _schema_cache_path()
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        data = {}
+    server, db = _connection_key(cur)
+    data[f"{server}|{db}"] = {
+        "version": _schema_version(cur),
+        "reports": {"schema": reports.schema, "table": reports.table},
+        "dom_schema": dom_schema,
+        "dom_table": dom_table,
+        "dom_name_col": dom_name_col,
+        "deps": [
+            {"schema": d.child_schema, "table": d.child_table, "column": d.child_column} for d in deps
+        ],
+    }
+    # Best-effort: a read-only profile must not break the run.
+    try:
+        ensure_dir(os.path.dirname(path))
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+    except OSError:
+        pass
+
+
+def ensure_retention_index(conn, cur, reports: ReportsTable, lang: str, logfile: str) -> None:
+    """Offer to create a covering index for the plan query.
+
+    Without it, filtering on Generation scans the clustered index — including
+    the multi-GB RawData blobs — and the load's ORDER BY Generation, ID sorts
+    the whole table. One index on (Generation, ID) with DomainID and
+    ImportedDate included covers both the ranked CTE and the ordered load, so
+    the plan step becomes a narrow ordered range scan. Optional: the tool
+    works without it, just slower.
+    """
+    info(tr(lang, K.INDEX_CHECK))
+    cur.execute(
+        "SELECT 1 FROM sys.indexes "
+        "WHERE name IN ('IX_Reports_Gen_ID', 'IX_Reports_Gen_Dom') AND object_id = OBJECT_ID(?);",
+        reports.fq,
+    )
+    if cur.fetchone():
+        return
+    warn(tr(lang, K.INDEX_MISSING))
+    if not Confirm.ask(tr(lang, K.INDEX_CREATE_Q), default=True):
+        return
+    try:
+        cur.execute(
+            f"CREATE NONCLUSTERED INDEX IX_Reports_Gen_ID ON {reports.fq} "
+            f"(Generation, ID) INCLUDE (DomainID, ImportedDate);"
+        )
+        conn.commit()
+        ok(tr(lang, K.INDEX_CREATED))
+        log_write(logfile, "[index] created IX_Reports_Gen_ID")
+    except Exception as e:
+        conn.rollback()
+        warn(f"{tr(lang, K.INDEX_FAIL)}: {e}")
+        log_write(logfile, f"[index] create failed: {e}")
+
+
+# -------------------------
+# Retention logic (Generation / Last report)
+# -------------------------
+# slots=True: no per-instance __dict__, which matters when one of these
+# exists per report row in multi-year databases.
+@dataclass(slots=True)
+class ReportRow:
+    id: int
+    domain_id: int
+    domain_name: str
+    imported: dt.datetime
+    generation: dt.datetime
+    # Rank among reports older than the cutoff, per (domain, month of
+    # Generation), latest first. 0 = recent (not ranked), 1 = monthly keeper,
+    # >1 = extra weekly report to remove. Computed by SQL Server.
+    old_rank: int = 0
+    # "YYYY-MM" of generation, formatted once here; plan export, preview and
+    # per-domain stats all reuse it instead of re-formatting per access.
+    month_key: str = ""
+
+    def __post_init__(self) -> None:
+        self.month_key = month_key_from_generation(self.generation)
+
+
+# Hoisted: normalize_dt runs twice per loaded row, so it should not re-chase
+# dt.timezone.utc through two attribute lookups each call.
+_UTC = dt.timezone.utc
+
+
+def utc_now() -> dt.datetime:
+    return dt.datetime.now(_UTC)
+
+
+def normalize_dt(value) -> dt.datetime:
+    # pyodbc hands back naive datetimes, so the common path is one tzinfo
+    # check plus a replace; aware values (and the TypeError guard) are rare.
+    if isinstance(value, dt.datetime):
+        if value.tzinfo is None:
+            return value.replace(tzinfo=_UTC)
+        return value.astimezone(_UTC)
+    raise TypeError("Unsupported datetime value")
+
+
+def month_key_from_generation(d: dt.datetime) -> str:
+    return f"{d.year:04d}-{d.month:02d}"
+
+
+def load_reports(
+    cur,
+    reports: ReportsTable,
+    dom_schema: str,
+    dom_table: str,
+    dom_name_col: str,
+    cutoff: dt.datetime,
+) -> List[ReportRow]:
+    # The "latest report per month per domain" grouping is pushed into SQL
+    # Server: reports older than the cutoff are ranked per (DomainID, month of
+    # Generation), latest first, so Python only has to read the rank back.
+    #
+    # Sargability: the only predicate is a bare-column range on Generation
+    # (bound as a datetime parameter, never a cast/convert on the column
+    # side), so an index on Generation can seek it. The month bucket only
+    # appears in the window PARTITION BY, where it cannot disable a seek.
+    cutoff_db = cutoff.astimezone(dt.timezone.utc).replace(tzinfo=None)
+    sql = f"""
+    ;WITH ranked AS (
+        SELECT ID,
+               ROW_NUMBER() OVER (
+                   PARTITION BY DomainID, DATEFROMPARTS(YEAR(Generation), MONTH(Generation), 1)
+                   ORDER BY Generation DESC, ID DESC
+               ) AS rn
+        FROM {reports.fq}
+        WHERE Generation < ?
+    )
+    SELECT r.ID, r.DomainID, d.{q(dom_name_col)} AS DomainName, r.ImportedDate, r.Generation,
+           COALESCE(k.rn, 0) AS OldRank
+    FROM {reports.fq} r
+    JOIN {q(dom_schema)}.{q(dom_table)} d ON d.ID = r.DomainID
+    LEFT JOIN ranked k ON k.ID = r.ID
+    ORDER BY r.Generation ASC, r.ID ASC
+    """
+    cur.arraysize = 5000
+    cur.execute(sql, cutoff_db)
+    out: List[ReportRow] = []
+    # Stream arraysize-sized network batches instead of materializing every
+    # pyodbc Row at once; each batch is dropped before the next fetch, and the
+    # per-batch list.extend over a generator avoids a bound append per row.
+    while True:
+        batch = cur.fetchmany()
+        if not batch:
+            break
+        out.extend(
+            ReportRow(
+                id=int(rid),
+                domain_id=int(did),
+                domain_name=str(dname),
+                imported=normalize_dt(imported),
+                generation=normalize_dt(gen),
+                old_rank=int(old_rank),
+            )
+            for rid, did, dname, imported, gen, old_rank in batch
+            # Defensive: a NULL Generation cannot be bucketed by the customer
+            # rule, so such rows are skipped.
+            if gen is not None
+        )
+    return out
+
+
+def compute_plan_monthly_over_cutoff(
+    reports: List[ReportRow],
+) -> Tuple[List[ReportRow], List[ReportRow], List[ReportRow]]:
+    # Ranks were computed by the DB (see load_reports); one pass to partition.
+    keep_recent: List[ReportRow] = []
+    keep_monthly: List[ReportRow] = []
+    delete_extras: List[ReportRow] = []
+
+    # reports arrives sorted by (Generation, ID) from the SQL ORDER BY, and
+    # appending preserves that order in each subset — no client-side re-sort.
+    for r in reports:
+        if r.old_rank == 0:
+            keep_recent.append(r)
+        elif r.old_rank == 1:
+            keep_monthly.append(r)
+        else:
+            delete_extras.append(r)
+
+    return keep_recent, keep_monthly, delete_extras
+
+
+# -------------------------
+# Exports
+# -------------------------
+def ensure_dir(path: str) -> None:
+    os.makedirs(path, exist_ok=True)
+
+
+def safe_default_archive_dir() -> str:
+    return r"C:\PingCastleArchive"
+
+
+def export_csv(path: str, rows: List[ReportRow]) -> None:
+    import csv
+
+    # 1 MiB buffer + writerows over a generator: the formatting loop runs in
+    # the csv module's C code and writes land in large chunks, instead of one
+    # writerow/syscall per report.
+    with open(path, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["ID", "DomainID", "DomainName", "ImportedDateUTC", "GenerationUTC", "Month(Generation)"])
+        w.writerows(
+            (
+                r.id,
+                r.domain_id,
+                r.domain_name,
+                r.imported.isoformat(),
+                r.generation.isoformat(),
+                r.month_key,
+            )
+            for r in rows
+        )
+
+
+def export_all_plan(
+    folder: str,
+    reports_all: List[ReportRow],
+    keep_recent: List[ReportRow],
+    keep_monthly: List[ReportRow],
+    delete_extras: List[ReportRow],
+) -> Dict[str, str]:
+    from concurrent.futures import ThreadPoolExecutor
+
+    ensure_dir(folder)
+    p_all = os.path.join(folder, "ALL_Reports.csv")
+    p_recent = os.path.join(folder, "KEEP_Recent.csv")
+    p_monthly = os.path.join(folder, "KEEP_Monthly.csv")
+    p_delete = os.path.join(folder, "DELETE_Extras.csv")
+
+    # The four files are independent; overlap their formatting and disk
+    # writes. Results are collected in submit order so the first failure
+    # surfaces deterministically.
+    with ThreadPoolExecutor(max_workers=4) as ex:
+        futures = [
+            ex.submit(export_csv, p_all, reports_all),
+            ex.submit(export_csv, p_recent, keep_recent),
+            ex.submit(export_csv, p_monthly, keep_monthly),
+            ex.submit(export_csv, p_delete, delete_extras),
+        ]
+        for fut in futures:
+            fut.result()
+
+    return {"ALL": p_all, "KEEP_Recent": p_recent, "KEEP_Monthly": p_monthly, "DELETE_Extras": p_delete}
+
+
+# JSONL rows carry the full RawData blob, so fetch far fewer of them per
+# batch than the metadata-only CSV export: the memory bound is
+# batch_size * largest blob.
+def export_archive_jsonl(cur, reports_table: ReportsTable, out_dir: str, batch_size: int = 256) -> str:
+    import base64
+    import json
+
+    # orjson serializes a few times faster than the stdlib and emits bytes
+    # directly; it is optional, stdlib json is the fallback.
+    try:
+        import orjson
+    except ImportError:
+        orjson = None
+
+    ensure_dir(out_dir)
+    out_file = os.path.join(out_dir, "ReportsArchive.jsonl")
+    # One query joined against the #PC_DeleteIds temp table (already populated
+    # by the dry-run step), streamed with fetchmany: a single round trip for
+    # the whole archive while only batch_size rows of RawData sit in memory.
+    sql = (
+        f"SELECT r.ID, r.DomainID, r.ImportedDate, r.Generation, r.RawData "
+        f"FROM {reports_table.fq} r JOIN #PC_DeleteIds d ON r.ID = d.ID "
+        f"ORDER BY r.ID;"
+    )
+
+    with open(out_file, "wb", buffering=1 << 20) as f:
+        cur.execute(sql)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            # Serialize the whole fetch batch, then write it as one chunk.
+            lines: List[bytes] = []
+            for row in rows:
+                raw = row[4]
+                raw_b64 = base64.b64encode(raw).decode("ascii") if raw is not None else None
+                payload = {
+                    "ID": int(row[0]),
+                    "DomainID": int(row[1]),
+                    "ImportedDate": normalize_dt(row[2]).isoformat(),
+                    "Generation": normalize_dt(row[3]).isoformat() if row[3] else None,
+                    "RawDataBase64": raw_b64,
+                }
+                if orjson is not None:
+                    lines.append(orjson.dumps(payload))
+                else:
+                    lines.append(json.dumps(payload, ensure_ascii=False).encode("utf-8"))
+            f.write(b"\n".join(lines) + b"\n")
+    return out_file
+
+
+def export_archive_csv(cur, reports_table: ReportsTable, out_dir: str, batch_size: int = 1000) -> str:
+    import csv
+
+    ensure_dir(out_dir)
+    out_file = os.path.join(out_dir, "ReportsArchive.csv")
+    # Deliberately no RawData in the SELECT list: the CSV archive is metadata
+    # only, so the multi-MB blobs never cross the wire on this path.
+    sql = (
+        f"SELECT r.ID, r.DomainID, r.ImportedDate, r.Generation "
+        f"FROM {reports_table.fq} r JOIN #PC_DeleteIds d ON r.ID = d.ID "
+        f"ORDER BY r.ID;"
+    )
+
+    with open(out_file, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+        w = csv.writer(f, delimiter=";")
+        w.writerow(["ID", "DomainID", "ImportedDateUTC", "GenerationUTC"])
+        cur.execute(sql)
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            for row in rows:
+                w.writerow(
+                    [
+                        int(row[0]),
+                        int(row[1]),
+                        normalize_dt(row[2]).isoformat(),
+                        normalize_dt(row[3]).isoformat() if row[3] else "",
+                    ]
+                )
+    return out_file
+
+
+def zip_folder(folder: str, zip_path: str, store: bool = False) -> None:
+    import zipfile
+
+    # store=True skips DEFLATE entirely: the JSONL archive is mostly base64,
+    # which barely compresses, so deflating it burns CPU on the critical path
+    # before the delete for almost no size gain. Otherwise compresslevel=1 is
+    # several times faster than the default level for a small size penalty.
+    if store:
+        z_args = {"compression": zipfile.ZIP_STORED}
+    else:
+        z_args = {"compression": zipfile.ZIP_DEFLATED, "compresslevel": 1}
+    with zipfile.ZipFile(zip_path, "w", **z_args) as z:
+        for root, _, files in os.walk(folder):
+            for fn in files:
+                full = os.path.join(root, fn)
+                rel = os.path.relpath(full, folder)
+                z.write(full, rel)
+
+
+# -------------------------
+# Delete logic
+# -------------------------
+# Above this many IDs, upload the list as one CSV string split server-side
+# instead of executemany batches.
+_BULK_ID_THRESHOLD = 10_000
+
+
+def _insert_ids_executemany(cur, ids: List[int]) -> None:
+    cur.fast_executemany = True
+    # Pre-declare the parameter type so fast_executemany binds a native
+    # int64 array instead of inferring a wide numeric on the first batch.
+    cur.setinputsizes([(pyodbc.SQL_BIGINT, 0, 0)])
+    cur.executemany("INSERT INTO #PC_DeleteIds (ID) VALUES (?);", [(i,) for i in ids])
+    cur.setinputsizes(None)
+
+
+def create_delete_ids_temp(cur, ids: List[int]) -> None:
+    cur.execute("IF OBJECT_ID('tempdb..#PC_DeleteIds') IS NOT NULL DROP TABLE #PC_DeleteIds;")
+    if len(ids) > _BULK_ID_THRESHOLD:
+        # Large lists: load into a heap from a single VARCHAR(MAX) parameter
+        # via STRING_SPLIT (one round trip, TABLOCK for minimal logging),
+        # then build the index once instead of maintaining a PK per row.
+        cur.execute("CREATE TABLE #PC_DeleteIds (ID BIGINT NOT NULL);")
+        try:
+            cur.execute(
+                "INSERT INTO #PC_DeleteIds WITH (TABLOCK) (ID) "
+                "SELECT CONVERT(BIGINT, value) FROM STRING_SPLIT(?, ',');",
+                ",".join(map(str, ids)),
+            )
+        except pyodbc.Error:
+            # STRING_SPLIT needs database COMPATIBILITY_LEVEL >= 130.
+            _insert_ids_executemany(cur, ids)
+        cur.execute("CREATE UNIQUE CLUSTERED INDEX IX_PC_DeleteIds ON #PC_DeleteIds (ID);")
+        return
+    cur.execute("CREATE TABLE #PC_DeleteIds (ID BIGINT NOT NULL PRIMARY KEY);")
+    if ids:
+        _insert_ids_executemany(cur, ids)
+
+
+def ensure_delete_ids_temp(cur, ids: List[int]) -> None:
+    # The session temp table survives from the dry-run to the delete phase;
+    # if it is still there with the expected row count, skip re-uploading the
+    # whole ID list over the wire.
+    cur.execute("SELECT OBJECT_ID('tempdb..#PC_DeleteIds');")
+    if cur.fetchone()[0] is not None:
+        cur.execute("SELECT COUNT_BIG(1) FROM #PC_DeleteIds;")
+        if int(cur.fetchone()[0]) == len(ids):
+            return
+    create_delete_ids_temp(cur, ids)
+
+
+def update_domains_first_last(cur, reports: ReportsTable, dom_schema: str, dom_table: str) -> None:
+    dom_fq = f"{q(dom_schema)}.{q(dom_table)}"
+    sql = f"""
+    ;WITH remaining AS (
+        SELECT r.DomainID, r.ID, r.Generation
+        FROM {reports.fq} r
+        WHERE NOT EXISTS (SELECT 1 FROM #PC_DeleteIds d WHERE d.ID = r.ID)
+    ),
+    ranked AS (
+        -- One scan of remaining with two window functions, instead of the
+        -- previous OUTER APPLY TOP 1 pair that re-scanned it per domain.
+        SELECT DomainID, ID,
+               ROW_NUMBER() OVER (PARTITION BY DomainID ORDER BY Generation ASC,  ID ASC)  AS rn_asc,
+               ROW_NUMBER() OVER (PARTITION BY DomainID ORDER BY Generation DESC, ID DESC) AS rn_desc
+        FROM remaining
+    ),
+    first_last AS (
+        SELECT DomainID,
+               COUNT(1) AS Cnt,
+               MIN(CASE WHEN rn_asc  = 1 THEN ID END) AS FirstReportID_New,
+               MIN(CASE WHEN rn_desc = 1 THEN ID END) AS LastReportID_New
+        FROM ranked
+        GROUP BY DomainID
+    )
+    UPDATE d
+        SET d.FirstReportID = fl.FirstReportID_New,
+            d.LastReportID  = fl.LastReportID_New,
+            d.NumberOfReport = fl.Cnt
+    FROM {dom_fq} d
+    LEFT JOIN first_last fl ON fl.DomainID = d.ID;
+    """
+    cur.execute(sql)
+
+
+# Per-statement delete batch: kept under SQL Server's lock-escalation
+# threshold so each batch takes row/page locks, and committed individually so
+# the transaction log can reuse space between batches.
+DELETE_BATCH_SIZE = 5000
+
+
+def delete_children_then_reports(conn, cur, reports: ReportsTable, deps: List[FKRef]) -> Dict[str, int]:
+    # Set-based DELETEs joined against the uploaded ID set, TOP (N) at a time.
+    # Each batch is its own committed transaction: a huge cleanup no longer
+    # holds a table lock or a multi-GB log reservation, at the cost of partial
+    # progress being kept if the run is interrupted mid-table (re-running the
+    # tool picks up the remainder).
+    counts: Dict[str, int] = {}
+    for ref in deps:
+        sql = (
+            f"DELETE TOP ({DELETE_BATCH_SIZE}) c FROM {ref.child_fq} c "
+            f"INNER JOIN #PC_DeleteIds d ON c.{q(ref.child_column)} = d.ID;"
+        )
+        while True:
+            cur.execute(sql)
+            n = cur.rowcount
+            conn.commit()
+            counts[str(ref.child_fq)] = counts.get(str(ref.child_fq), 0) + n
+            if n < DELETE_BATCH_SIZE:
+                break
+
+    parent_sql = (
+        f"DELETE TOP ({DELETE_BATCH_SIZE}) r FROM {reports.fq} r "
+        f"INNER JOIN #PC_DeleteIds d ON r.ID = d.ID;"
+    )
+    while True:
+        cur.execute(parent_sql)
+        n = cur.rowcount
+        conn.commit()
+        counts[str(reports.fq)] = counts.get(str(reports.fq), 0) + n
+        if n < DELETE_BATCH_SIZE:
+            break
+    return counts
+
+
+def dryrun_counts(cur, reports: ReportsTable, deps: List[FKRef]) -> List[Tuple[str, int]]:
+    rows: List[Tuple[str, int]] = []
+    # COUNT_BIG + INNER JOIN on the temp table: same shape the real DELETE
+    # uses, so the optimizer picks the same plan and the counts stay honest
+    # on tables past the INT row-count range.
+    cur.execute(f"SELECT COUNT_BIG(1) FROM {reports.fq} r INNER JOIN #PC_DeleteIds d ON r.ID = d.ID;")
+    rows.append((str(reports.fq), int(cur.fetchone()[0])))
+
+    for ref in deps:
+        cur.execute(f"SELECT COUNT_BIG(1) FROM {ref.child_fq} c INNER JOIN #PC_DeleteIds d ON c.{q(ref.child_column)} = d.ID;")
+        rows.append((str(ref.child_fq), int(cur.fetchone()[0])))
+    return rows
+
+
+# -------------------------
+# UI helpers
+# -------------------------
+def show_header(lang: str) -> None:
+    title = Text(tr(lang, K.TITLE), style="bold white")
+    subtitle = Text(tr(lang, K.SUBTITLE), style="bold cyan")
+    tagline = Text(tr(lang, K.TAGLINE), style="dim")
+    author = Text(tr(lang, K.AUTHOR) + "    " + tr(lang, K.VENDOR), style="dim")
+    sysline = Text(f"{platform.system()} {platform.release()} • Python {platform.python_version()}", style="dim")
+
+    content = Text.assemble(title, "\n", subtitle, "\n", tagline, "\n", author, "\n", sysline)
+    panel = Panel(Align.center(content), border_style="bright_cyan")
+    console.print(panel)
+
+
+def step_rule(lang: str, n: int, label: str) -> None:
+    console.print(Rule(f"[bold cyan]{tr(lang, K.STEP)} {n}[/bold cyan] • {label}"))
+
+
+def progress_run(label: str, func):
+    with Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        TimeElapsedColumn(),
+        console=console,
+        transient=True,
+    ) as p:
+        t = p.add_task(label, total=None)
+        result = func()
+        p.update(t, completed=1)
+        return result
+
+
+def show_summary(lang: str, total: int, cutoff: dt.datetime, old: int, keep_recent: int, keep_monthly: int, extras: int) -> None:
+    tb = Table(title=tr(lang, K.SUMMARY), show_lines=True)
+    tb.add_column("Metric")
+    tb.add_column("Value", justify="right")
+
+    tb.add_row(tr(lang, K.TOTAL), str(total))
+    tb.add_row(tr(lang, K.CUTOFF), cutoff.isoformat())
+    tb.add_row(tr(lang, K.OLD), str(old))
+    tb.add_row(tr(lang, K.KEEP_RECENT), str(keep_recent))
+    tb.add_row(tr(lang, K.KEEP_MONTHLY), str(keep_monthly))
+    tb.add_row(tr(lang, K.EXTRAS), str(extras))
+
+    console.print(tb)
+
+
+def show_dryrun_table(lang: str, rows: List[Tuple[str, int]]) -> None:
+    tb = Table(title=tr(lang, K.DRYRUN_TABLE), show_lines=True)
+    tb.add_column("Table", overflow="fold")
+    tb.add_column("Rows", justify="right")
+    for name, cnt in rows:
+        tb.add_row(name, str(cnt))
+    console.print(tb)
+
+
+def top_removals_by_domain(delete_extras: List[ReportRow], keep_monthly: List[ReportRow], topn: int = 10) -> List[Tuple[str, int, int]]:
+    # Counter does the accumulation in C, and most_common is heap-based, so
+    # the full list is never sorted just to take the top N.
+    remove_counts = Counter(r.domain_name for r in delete_extras)
+    kept_counts = Counter(r.domain_name for r in keep_monthly)
+    return [(dom, cnt, kept_counts.get(dom, 0)) for dom, cnt in remove_counts.most_common(topn)]
+
+
+def show_domain_table(lang: str, rows: List[Tuple[str, int, int]]) -> None:
+    tb = Table(title=tr(lang, K.PER_DOMAIN), show_lines=True)
+    tb.add_column(tr(lang, K.DOMAIN), overflow="fold")
+    tb.add_column(tr(lang, K.REMOVE_COUNT), justify="right")
+    tb.add_column(tr(lang, K.KEPT_OLD_MONTHLY), justify="right")
+    for dom, rm, kept in rows:
+        tb.add_row(dom, str(rm), str(kept))
+    console.print(tb)
+
+
+def show_preview_delete(lang: str, delete_extras: List[ReportRow], limit: int = 12) -> None:
+    tb = Table(title=tr(lang, K.PREVIEW_DELETE), show_lines=False)
+    tb.add_column("ID", justify="right")
+    tb.add_column("Domain", overflow="fold")
+    tb.add_column("Generation (UTC)", overflow="fold")
+    tb.add_column("Month", justify="center")
+
+    for r in delete_extras[:limit]:
+        tb.add_row(str(r.id), r.domain_name, r.generation.isoformat(), r.month_key)
+    console.print(tb)
+
+
+# -------------------------
+# Main prompts
+# -------------------------
+def choose_language() -> str:
+    while True:
+        lang = Prompt.ask("Language [EN/FR/IT/DE/ES]", default="FR").strip().upper()
+        if lang in LANGS:
+            return lang
+        console.print("Invalid language. Use EN/FR/IT/DE/ES.")
+
+
+def choose_retention_days(lang: str) -> int:
+    console.print(Panel(tr(lang, K.RETENTION), border_style="cyan"))
+    console.print(tr(lang, K.RET_1Y))
+    console.print(tr(lang, K.RET_6M))
+    console.print(tr(lang, K.RET_CUSTOM))
+    while True:
+        s = Prompt.ask(tr(lang, K.RET_PROMPT), default="1").strip()
+        if s == "1":
+            return 365
+        if s == "2":
+            return 183
+        if s == "3":
+            d = Prompt.ask(tr(lang, K.CUSTOM_DAYS), default="365").strip()
+            if d.isdigit() and int(d) > 0:
+                return int(d)
+        warn(tr(lang, K.INVALID))
+
+
+def validate_writable_dir(path: str) -> bool:
+    try:
+        ensure_dir(path)
+        testfile = os.path.join(path, f".write_test_{os.getpid()}.tmp")
+        with open(testfile, "w", encoding="utf-8") as f:
+            f.write("ok")
+        os.remove(testfile)
+        return True
+    except Exception:
+        return False
+
+
+# -------------------------
+# Main
+# -------------------------
+def main() -> int:
+    # One clock read per run: the same instant names the log/plan/archive
+    # files and anchors the retention cutoff.
+    run_now = utc_now()
+    run_stamp = now_stamp(run_now)
+    logfile = log_path_default(run_now)
+    log_write(logfile, "=== PingCastle Maintenance START ===")
+
+    lang = choose_language()
+    show_header(lang)
+
+    console.print(Panel(tr(lang, K.LOGIC_BODY), title=tr(lang, K.LOGIC_TITLE), border_style="cyan"))
+
+    step_rule(lang, 1, tr(lang, K.SQL_CONN))
+
+    while True:
+        try:
+            conn, _ = connect_sqlserver_interactive(lang, logfile)
+            break
+        except Exception as e:
+            err(tr(lang, K.TEST_FAIL))
+            err(str(e))
+            log_write(logfile, f"[conn] FAIL: {e}")
+            if not Confirm.ask(tr(lang, K.RETRY), default=True):
+                console.print(f"{tr(lang, K.LOGFILE)}: {logfile}")
+                return 2
+
+    cur = conn.cursor()
+    # Batched parameter binding for every executemany on this cursor
+    # (one round trip per batch instead of per row).
+    cur.fast_executemany = True
+
+    cached_schema = load_schema_cache(cur)
+
+    step_rule(lang, 2, tr(lang, K.DETECT_REPORTS))
+    if cached_schema is not None:
+        reports, dom_schema, dom_table, dom_name_col, deps = cached_schema
+    else:
+        reports = progress_run(tr(lang, K.DETECT_REPORTS), lambda: detect_reports_table(cur))
+    ok(f"{tr(lang, K.REPORTS_FOUND)}: {reports.fq}")
+    log_write(logfile, f"[detect] Reports={reports.fq}{' (cached)' if cached_schema else ''}")
+
+    if cached_schema is None:
+        dom_schema, dom_table, dom_name_col = detect_report_name_source(cur)
+    ok(f"{tr(lang, K.USING_DOMAIN_NAME)}: {q(dom_schema)}.{q(dom_table)}.{q(dom_name_col)}")
+    log_write(logfile, f"[detect] Domains={q(dom_schema)}.{q(dom_table)} namecol={dom_name_col}")
+
+    step_rule(lang, 3, tr(lang, K.DETECT_CHILDREN))
+    if cached_schema is None:
+        deps = progress_run(tr(lang, K.DETECT_CHILDREN), lambda: detect_dependent_tables(cur, reports))
+        save_schema_cache(cur, reports, dom_schema, dom_table, dom_name_col, deps)
+    ok(f"{tr(lang, K.CHILDREN_FOUND)}: {len(deps)}")
+    log_write(logfile, f"[detect] deps={len(deps)}")
+
+    ensure_retention_index(conn, cur, reports, lang, logfile)
+
+    step_rule(lang, 4, tr(lang, K.RETENTION))
+    cutoff_days = choose_retention_days(lang)
+    cutoff = run_now - dt.timedelta(days=cutoff_days)
+
+    step_rule(lang, 5, tr(lang, K.PLAN))
+    reports_all = progress_run(tr(lang, K.LOADING_REPORTS), lambda: load_reports(cur, reports, dom_schema, dom_table, dom_name_col, cutoff))
+    keep_recent, keep_monthly, delete_extras = compute_plan_monthly_over_cutoff(reports_all)
+
+    # Every non-recent row is "old" by the planner's partition; no need to
+    # rescan reports_all comparing generations.
+    old_count = len(reports_all) - len(keep_recent)
+
+    show_summary(
+        lang,
+        total=len(reports_all),
+        cutoff=cutoff,
+        old=old_count,
+        keep_recent=len(keep_recent),
+        keep_monthly=len(keep_monthly),
+        extras=len(delete_extras),
+    )
+
+    domain_rows = top_removals_by_domain(delete_extras, keep_monthly, topn=10)
+    if domain_rows:
+        show_domain_table(lang, domain_rows)
+
+    if delete_extras:
+        show_preview_delete(lang, delete_extras, limit=12)
+
+    step_rule(lang, 6, tr(lang, K.EXPORT_PLAN))
+    plan_folder = os.path.join(os.getcwd(), f"PingCastlePlan-{run_stamp}")
+    paths = export_all_plan(plan_folder, reports_all, keep_recent, keep_monthly, delete_extras)
+    ok(tr(lang, K.PLAN_EXPORTED))
+    console.print(f"{tr(lang, K.PLAN_FOLDER)}: [bold]{plan_folder}[/bold]")
+    console.print(f"  ALL:            {paths['ALL']}")
+    console.print(f"  KEEP recent:     {paths['KEEP_Recent']}")
+    console.print(f"  KEEP monthly:    {paths['KEEP_Monthly']}")
+    console.print(f"  DELETE extras:   {paths['DELETE_Extras']}")
+    log_write(logfile, f"[plan] folder={plan_folder}")
+
+    if not delete_extras:
+        ok(tr(lang, K.NO_EXTRAS))
+        conn.rollback()
+        console.print(f"{tr(lang, K.LOGFILE)}: {logfile}")
+        return 0
+
+    default_archive = safe_default_archive_dir()
+    console.print(f"\n[dim]{tr(lang, K.SAFE_DEFAULT_ARCHIVE)}: {default_archive}[/dim]\n")
+
+    # Default prompt must show archive/delete
+    action = Prompt.ask(tr(lang, K.ACTION_OLD), default="archive/delete").strip().lower()
+    if action not in ("archive", "delete"):
+        action = "archive"
+
+    archive_dir = ""
+    archive_fmt = "jsonl"
+    make_zip = True
+
+    if action == "archive":
+        archive_dir = Prompt.ask(tr(lang, K.ARCHIVE_DIR), default=default_archive).strip()
+        while not validate_writable_dir(archive_dir):
+            warn(f"{tr(lang, K.ARCHIVE_DIR)} not writable. Please choose another path.")
+            archive_dir = Prompt.ask(tr(lang, K.ARCHIVE_DIR), default=default_archive).strip()
+
+        archive_fmt = Prompt.ask(tr(lang, K.ARCHIVE_FMT), default="jsonl").strip().lower()
+        if archive_fmt not in ("jsonl", "csv"):
+            archive_fmt = "jsonl"
+
+        make_zip = Confirm.ask(tr(lang, K.ZIP_Q), default=True)
+
+    step_rule(lang, 7, tr(lang, K.DRYRUN_PREP))
+
+    ids_to_delete = [r.id for r in delete_extras]
+    ensure_delete_ids_temp(cur, ids_to_delete)
+    counts = dryrun_counts(cur, reports, deps)
+    show_dryrun_table(lang, counts)
+    ok(f"{tr(lang, K.DRYRUN_READY)}: {len(ids_to_delete)}")
+    log_write(logfile, f"[dryrun] delete_reports={len(ids_to_delete)}")
+
+    if not Confirm.ask(tr(lang, K.APPLY), default=False):
+        ok(tr(lang, K.DRYRUN_ONLY))
+        conn.rollback()
+        log_write(logfile, "Dry-run only. ROLLBACK.")
+        console.print(f"{tr(lang, K.LOGFILE)}: {logfile}")
+        return 0
+
+    try:
+        # Archive first
+        if action == "archive":
+            step_rule(lang, 8, tr(lang, K.ARCHIVING))
+            out_folder = os.path.join(archive_dir, f"PingCastleArchive-{run_stamp}")
+            ensure_dir(out_folder)
+
+            def do_archive():
+                if archive_fmt == "jsonl":
+                    return export_archive_jsonl(cur, reports, out_folder)
+                return export_archive_csv(cur, reports, out_folder)
+
+            archive_file = progress_run("Exporting archive", do_archive)
+            ok(f"{tr(lang, K.ARCHIVE_CREATED)}: {archive_file}")
+
+            if make_zip:
+                zip_path = out_folder + ".zip"
+                zip_folder(out_folder, zip_path, store=(archive_fmt == "jsonl"))
+                ok(f"{tr(lang, K.ZIP_CREATED)}: {zip_path}")
+                log_write(logfile, f"[archive] zip={zip_path}")
+            else:
+                log_write(logfile, f"[archive] folder={out_folder}")
+
+        # Final confirmation
+        step_rule(lang, 9, tr(lang, K.DELETING))
+        if not Confirm.ask(tr(lang, K.FINAL_CONFIRM), default=False):
+            ok(tr(lang, K.CANCELLED))
+            conn.rollback()
+            log_write(logfile, "Cancelled before delete. ROLLBACK.")
+            console.print(f"{tr(lang, K.LOGFILE)}: {logfile}")
+            return 0
+
+        # Ensure temp table exists and pointers are fixed
+        ensure_delete_ids_temp(cur, ids_to_delete)
+        update_domains_first_last(cur, reports, dom_schema, dom_table)
+
+        def do_delete():
+            return delete_children_then_reports(conn, cur, reports, deps)
+
+        with Progress(SpinnerColumn(), TextColumn("{task.description}"), TimeElapsedColumn(), console=console) as p:
+            t = p.add_task("Deleting...", total=None)
+            deleted = do_delete()
+            p.update(t, completed=1)
+
+        conn.commit()
+        ok(tr(lang, K.DONE))
+        log_write(logfile, f"[delete] committed. deleted={deleted}")
+
+    except Exception as e:
+        conn.rollback()
+        err(f"{tr(lang, K.ERR)}: {e}")
+        log_write(logfile, "[EXCEPTION]")
+        log_write(logfile, traceback.format_exc())
+        console.print(f"{tr(lang, K.LOGFILE)}: {logfile}")
+        return 3
+
+    console.print(f"{tr(lang, K.LOGFILE)}: {logfile}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+